@@ -7,6 +7,7 @@
 import json
 import time
 import random
+import threading
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -16,6 +17,108 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from webdriver_manager.chrome import ChromeDriverManager
+from page_parser import parse_ip_info_from_html, parse_html_file, missing_key_fields
+import resource_monitor
+from resilience import CheckDeadlineExceeded
+from config import BROWSER_RESOURCE_CONFIG
+
+PING0_URL = "https://ping0.cc"
+
+
+def lookup_url(ip=None):
+    """检测页面地址：不指定IP时为首页（查询当前出口IP），否则为 /ip/<地址> 查询页"""
+    return f"{PING0_URL}/ip/{ip}" if ip else PING0_URL
+
+
+# 导航计时脚本：读取当前文档的 Navigation Timing / Resource Timing（单位毫秒）
+# 通过代理访问时DNS解析发生在代理端，"连接"即为到代理的连接耗时
+NAVIGATION_TIMING_JS = r"""
+var nav = performance.getEntriesByType('navigation')[0];
+if (!nav) { return null; }
+var ms = function (value) { return Math.round(Math.max(value, 0) * 10) / 10; };
+var resources = performance.getEntriesByType('resource');
+var resourceBytes = 0;
+for (var i = 0; i < resources.length; i++) { resourceBytes += resources[i].transferSize || 0; }
+return {
+    'DNS': ms(nav.domainLookupEnd - nav.domainLookupStart),
+    '连接': ms(nav.connectEnd - nav.connectStart),
+    'TLS': nav.secureConnectionStart > 0 ? ms(nav.connectEnd - nav.secureConnectionStart) : 0,
+    '首字节': ms(nav.responseStart - nav.requestStart),
+    '首字节(总)': ms(nav.responseStart - nav.startTime),
+    '下载': ms(nav.responseEnd - nav.responseStart),
+    'DOM解析': ms(nav.domContentLoadedEventEnd - nav.responseEnd),
+    '加载完成': ms(nav.loadEventEnd - nav.startTime),
+    '传输字节': nav.transferSize || 0,
+    '压缩字节': nav.encodedBodySize || 0,
+    '解压字节': nav.decodedBodySize || 0,
+    '协议': nav.nextHopProtocol || '',
+    '资源数': resources.length,
+    '资源传输字节': resourceBytes
+};
+"""
+
+# 页内提取脚本：一次execute_script直接读取JS变量和DOM字段，只回传精简的结果对象
+EXTRACT_IP_INFO_JS = r"""
+var info = {};
+var put = function (key, value) {
+    if (value !== undefined && value !== null && String(value).trim() !== '') {
+        info[key] = String(value).trim();
+    }
+};
+var q = function (selector) { return document.querySelector(selector); };
+var text = function (el) { return el ? el.textContent.replace(/\s+/g, ' ').trim() : ''; };
+// 取内容区域中第一个非空文本节点（跳过前面的IDC/ISP小标签）
+var ownText = function (el) {
+    if (!el) { return ''; }
+    for (var i = 0; i < el.childNodes.length; i++) {
+        var node = el.childNodes[i];
+        if (node.nodeType === 3 && node.textContent.trim()) { return node.textContent.trim(); }
+    }
+    return '';
+};
+
+info['页面标题'] = document.title;
+info['页面URL'] = location.href;
+
+put('IP地址', window.ip);
+put('IP地址(数字)', window.ipnum);
+put('经度', window.longitude);
+put('纬度', window.latitude);
+put('IP位置', window.loc || ownText(q('.line.loc .content')));
+put('ASN域名', window.asndomain);
+put('企业域名', window.orgdomain);
+
+var asn = text(q('.line.asn .content a')).match(/AS(\d+)/);
+if (asn) { info['ASN'] = 'AS' + asn[1]; }
+
+put('ASN所有者', ownText(q('.line.asnname .content')));
+put('企业', ownText(q('.line.orgname .content')));
+put('IP类型', text(q('.line-iptype .content .label')));
+put('风控值', text(q('.line-risk .riskcurrent .value')));
+put('风控等级', text(q('.line-risk .riskcurrent .lab')));
+put('原生IP', text(q('.line-nativeip .content .label')));
+
+var flag = q('.line.loc img[src*="/static/images/flags/"]') || q('img[src*="/static/images/flags/"]');
+if (flag) {
+    var code = flag.getAttribute('src').match(/flags\/([^\/]+)\.png/);
+    if (code) { info['国家代码'] = code[1]; }
+}
+
+var bodyText = document.body ? document.body.innerText : '';
+if (!info['IP地址']) {
+    var ipMatch = bodyText.match(/\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b/);
+    if (ipMatch) { info['IP地址'] = ipMatch[0]; }
+}
+if (!info['IP地址'] || !info['IP位置'] || !info['ASN']) {
+    info['调试_页面文本'] = bodyText.slice(0, 500);
+}
+
+try {
+    var timing = (function () {""" + NAVIGATION_TIMING_JS + r"""})();
+    if (timing) { info['性能计时'] = timing; }
+} catch (e) {}
+return info;
+"""
 
 class AdvancedPing0CCChecker:
     """高级ping0.cc检查器 - 专门处理反机器人检测"""
@@ -23,10 +126,24 @@ class AdvancedPing0CCChecker:
     def __init__(self):
         self.driver = None
         self.wait = None
+        self.proxy_url = None
+        self.launch_seconds = 0
+        self.last_error = None          # 最近一次检测中捕获的异常，用于失败分类
+        self.challenge_cleared = True   # 最近一次检测是否通过了反机器人验证
+        self.profile_dir = None         # 带属主标记的临时配置目录，用于识别残留进程
+        self.driver_pid = None          # chromedriver进程PID，浏览器进程树的根
+        self.checks_on_browser = 0      # 当前浏览器已执行的检测次数
+        self.resource_usage = None      # 最近一次检测后的浏览器资源占用
+        self.recycle_count = 0          # 因超出资源限制而回收浏览器的次数
+        self.service = None
+        self.deadline = None            # 本次检测的截止时间（time.time()），None为不限
+        self.timed_out = False          # 本次检测是否因超时被强制结束
+        self._watchdog = None
         
     def setup_stealth_driver(self, proxy_url="http://127.0.0.1:7890"):
         """设置隐秘浏览器驱动"""
         print("🔧 设置高级反检测浏览器...")
+        launch_start = time.time()
         
         options = Options()
         
@@ -65,10 +182,17 @@ class AdvancedPing0CCChecker:
             'intl.accept_languages': 'zh-CN,zh,en-US,en'
         })
         
+        # 临时配置目录（目录名带本进程PID，异常退出后可识别并清理残留进程）
+        self.profile_dir = resource_monitor.create_profile_dir()
+        options.add_argument(f"--user-data-dir={self.profile_dir}")
+        
         # 初始化驱动
         service = Service(ChromeDriverManager().install())
+        self.service = service
         self.driver = webdriver.Chrome(service=service, options=options)
-        self.wait = WebDriverWait(self.driver, 20)
+        self.driver_pid = getattr(service.process, "pid", None)
+        self.checks_on_browser = 0
+        self.wait = WebDriverWait(self.driver, self.bounded_timeout(20))
         
         # 执行高级反检测脚本
         stealth_js = """
@@ -80,7 +204,111 @@ class AdvancedPing0CCChecker:
         """
         self.driver.execute_script(stealth_js)
         
-        print("✅ 浏览器设置完成")
+        self.proxy_url = proxy_url
+        self.launch_seconds = time.time() - launch_start
+        print(f"✅ 浏览器设置完成 (启动耗时 {self.launch_seconds:.1f}秒)")
+    
+    def launch(self, proxy_url, timeout=None):
+        """在时间预算内启动浏览器，到期时看门狗强制结束浏览器并抛出 CheckDeadlineExceeded"""
+        self._arm_watchdog(timeout)
+        try:
+            self.setup_stealth_driver(proxy_url)
+        except Exception as e:
+            if self.timed_out:
+                raise CheckDeadlineExceeded("启动浏览器超过时间预算") from e
+            raise
+        finally:
+            self._disarm_watchdog()
+        if self.timed_out:
+            raise CheckDeadlineExceeded("启动浏览器超过时间预算")
+    
+    def is_ready(self, proxy_url=None):
+        """浏览器是否已启动且可用（指定代理时还要求代理一致）"""
+        if not self.driver:
+            return False
+        if proxy_url is not None and proxy_url != self.proxy_url:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def close(self):
+        """关闭浏览器，并结束quit后仍残留的进程、删除临时配置目录"""
+        leftovers = resource_monitor.process_tree(self.driver_pid)
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        if leftovers:
+            resource_monitor.kill_processes([p for p in leftovers if p.is_running()])
+        resource_monitor.remove_profile_dir(self.profile_dir)
+        self.driver = None
+        self.wait = None
+        self.service = None
+        self.driver_pid = None
+        self.profile_dir = None
+    
+    def remaining(self):
+        """距本次检测截止还剩多少秒，不限时为无穷大"""
+        return float("inf") if self.deadline is None else self.deadline - time.time()
+    
+    def bounded_timeout(self, seconds):
+        """不超过剩余时间的等待时长"""
+        return max(min(seconds, self.remaining()), 0.1)
+    
+    def check_deadline(self):
+        """时间预算已用完时抛出 CheckDeadlineExceeded"""
+        if self.timed_out or self.remaining() <= 0:
+            raise CheckDeadlineExceeded("检测超过时间预算")
+    
+    def sleep(self, seconds):
+        """在截止时间内等待，不会越过截止时间"""
+        self.check_deadline()
+        time.sleep(min(seconds, self.remaining()))
+        self.check_deadline()
+    
+    def kill_browser(self):
+        """强制结束浏览器进程（不经过WebDriver），阻塞中的WebDriver调用会随之出错返回"""
+        process = getattr(self.service, "process", None)
+        pid = self.driver_pid or getattr(process, "pid", None)
+        if not resource_monitor.kill_process_tree(pid) and process is not None:
+            try:
+                process.kill()
+            except Exception:
+                pass
+    
+    def _on_deadline(self):
+        self.timed_out = True
+        print("⏰ 检测超过时间预算，强制结束浏览器")
+        self.kill_browser()
+    
+    def _arm_watchdog(self, timeout):
+        """启动看门狗：到达截止时间时强制结束浏览器"""
+        self.timed_out = False
+        self.deadline = time.time() + timeout if timeout else None
+        if self.deadline is not None:
+            self._watchdog = threading.Timer(timeout, self._on_deadline)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+    
+    def _disarm_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        self.deadline = None
+    
+    def sample_resources(self):
+        """统计浏览器进程树当前的内存、CPU时间和子进程数（psutil不可用时为None）"""
+        self.resource_usage = resource_monitor.sample_process_tree(self.driver_pid)
+        return self.resource_usage
+    
+    def needs_recycle(self):
+        """浏览器是否超出资源限制或复用次数上限，需要回收重启"""
+        return (resource_monitor.exceeds_limits(self.resource_usage)
+                or self.checks_on_browser >= BROWSER_RESOURCE_CONFIG["max_checks_per_browser"])
     
     def wait_for_bot_detection_bypass(self):
         """等待绕过机器人检测"""
@@ -95,18 +323,18 @@ class AdvancedPing0CCChecker:
                 print(f"🔄 第{attempt + 1}次尝试绕过检测...")
                 
                 # 等待JavaScript执行
-                time.sleep(5 + attempt * 2)
+                self.sleep(5 + attempt * 2)
                 
                 # 尝试简单的页面交互
                 try:
                     # 简单点击页面中心
                     self.driver.execute_script("document.body.click();")
                     time.sleep(random.uniform(1, 2))
-                except:
+                except Exception:
                     pass
                 
                 # 等待更长时间
-                time.sleep(8 + attempt * 3)
+                self.sleep(8 + attempt * 3)
                 
             else:
                 print("✅ 成功绕过机器人检测")
@@ -116,116 +344,63 @@ class AdvancedPing0CCChecker:
         return False
     
     def extract_ip_info_advanced(self, loop_index=1):
-        """高级IP信息提取 - 基于ping0.cc页面结构优化"""
+        """高级IP信息提取 - 优先在页面内一次性提取，失败时回退到页面源码解析"""
         print("📊 提取IP信息...")
         
         # 等待页面完全加载
         try:
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        except:
-            pass
+            WebDriverWait(self.driver, self.bounded_timeout(20)).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body")))
+        except Exception:
+            self.check_deadline()
         
-        # 获取页面内容
-        page_source = self.driver.page_source
+        ip_info = self.extract_ip_info_script(loop_index)
+        if ip_info is not None:
+            return ip_info
+        
+        return self.extract_ip_info_from_source(loop_index)
+    
+    def extract_ip_info_script(self, loop_index=1):
+        """页内提取 - 单次execute_script往返，返回None表示脚本执行失败"""
+        try:
+            result = self.driver.execute_script(EXTRACT_IP_INFO_JS)
+        except Exception as e:
+            print(f"⚠️ 页内提取失败，回退到源码解析: {e}")
+            return None
+        
+        if not isinstance(result, dict):
+            return None
         
         ip_info = {
             "循环索引": loop_index,
             "检测时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "页面标题": self.driver.title,
-            "页面URL": self.driver.current_url,
         }
+        ip_info.update(result)
         
-        import re
-        
-        # 从JavaScript变量中提取信息（最准确的方法）
-        js_ip_match = re.search(r"window\.ip\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_ip_match:
-            ip_info["IP地址"] = js_ip_match.group(1)
-        
-        js_ipnum_match = re.search(r"window\.ipnum\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_ipnum_match:
-            ip_info["IP地址(数字)"] = js_ipnum_match.group(1)
-        
-        js_longitude_match = re.search(r"window\.longitude\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_longitude_match:
-            ip_info["经度"] = js_longitude_match.group(1)
-        
-        js_latitude_match = re.search(r"window\.latitude\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_latitude_match:
-            ip_info["纬度"] = js_latitude_match.group(1)
-        
-        js_loc_match = re.search(r"window\.loc\s*=\s*`([^`]+)`", page_source)
-        if js_loc_match:
-            ip_info["IP位置"] = js_loc_match.group(1)
-        
-        js_asndomain_match = re.search(r"window\.asndomain\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_asndomain_match:
-            ip_info["ASN域名"] = js_asndomain_match.group(1)
-        
-        js_orgdomain_match = re.search(r"window\.orgdomain\s*=\s*['\"]([^'\"]+)['\"]", page_source)
-        if js_orgdomain_match:
-            ip_info["企业域名"] = js_orgdomain_match.group(1)
-        
-        # 提取ASN信息
-        asn_pattern = r'<a href="[^"]*\/as\/AS(\d+)"[^>]*>AS(\d+)<\/a>'
-        asn_match = re.search(asn_pattern, page_source)
-        if asn_match:
-            ip_info["ASN"] = f"AS{asn_match.group(1)}"
-        
-        # 提取ASN所有者
-        asn_owner_pattern = r'<div class="name">\s*ASN 所有者\s*</div>\s*<div class="content">\s*(?:<span[^>]*>[^<]*</span>\s*)?([^<\n]+?)(?:\s*<span|</div>)'
-        asn_owner_match = re.search(asn_owner_pattern, page_source, re.DOTALL)
-        if asn_owner_match:
-            ip_info["ASN所有者"] = asn_owner_match.group(1).strip()
-        
-        # 提取企业信息
-        org_pattern = r'<div class="name">\s*企业\s*</div>\s*<div class="content">\s*(?:<span[^>]*>[^<]*</span>\s*)?([^<\n]+?)(?:\s*<span|</div>)'
-        org_match = re.search(org_pattern, page_source, re.DOTALL)
-        if org_match:
-            ip_info["企业"] = org_match.group(1).strip()
-        
-        # 提取IP类型
-        iptype_pattern = r'<span class="label[^"]*">([^<]+)</span>'
-        iptype_matches = re.findall(iptype_pattern, page_source)
-        for iptype in iptype_matches:
-            if "IDC" in iptype or "家庭宽带" in iptype:
-                ip_info["IP类型"] = iptype.strip()
-                break
-        
-        # 提取风控值
-        risk_pattern = r'<span class="value">(\d+%)</span><span class="lab">\s*([^<]+)</span>'
-        risk_match = re.search(risk_pattern, page_source)
-        if risk_match:
-            ip_info["风控值"] = risk_match.group(1)
-            ip_info["风控等级"] = risk_match.group(2).strip()
-        
-        # 提取原生IP信息
-        native_ip_pattern = r'<div class="name">\s*<span>原生 IP</span>.*?</div>\s*<div class="content">\s*<span class="label[^"]*"[^>]*>([^<]+)</span>'
-        native_ip_match = re.search(native_ip_pattern, page_source, re.DOTALL)
-        if native_ip_match:
-            ip_info["原生IP"] = native_ip_match.group(1).strip()
+        missing_fields = [field for field in ["IP地址", "IP位置", "ASN"] if not ip_info.get(field)]
+        if missing_fields:
+            print(f"⚠️ 缺失字段: {', '.join(missing_fields)}")
         
-        # 提取国家旗帜信息
-        flag_pattern = r'<img src="/static/images/flags/([^"]+)\.png"[^>]*>([^<]+)'
-        flag_matches = re.findall(flag_pattern, page_source)
-        if flag_matches:
-            ip_info["国家代码"] = flag_matches[0][0]
-            # IP位置信息已经通过JS变量获取，这里不覆盖
+        return ip_info
+    
+    def collect_navigation_timing(self):
+        """读取当前页面的导航计时和传输字节数，失败时返回None"""
+        try:
+            timing = self.driver.execute_script(NAVIGATION_TIMING_JS)
+        except Exception:
+            return None
+        return timing if isinstance(timing, dict) else None
+    
+    def extract_ip_info_from_source(self, loop_index=1):
+        """源码解析提取 - 拉取完整页面源码后用正则匹配"""
+        # 获取页面内容
+        page_source = self.driver.page_source
         
-        # 备用提取方法 - 如果JS变量提取失败
-        if not ip_info.get("IP地址"):
-            ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
-            ip_matches = re.findall(ip_pattern, page_source)
-            if ip_matches:
-                ip_info["IP地址"] = ip_matches[0]
+        ip_info = parse_ip_info_from_html(page_source, loop_index,
+                                          page_title=self.driver.title, page_url=self.driver.current_url)
         
         # 如果重要信息缺失，记录调试信息
-        missing_fields = []
-        required_fields = ["IP地址", "IP位置", "ASN"]
-        for field in required_fields:
-            if not ip_info.get(field):
-                missing_fields.append(field)
-        
+        missing_fields = missing_key_fields(ip_info)
         if missing_fields:
             print(f"⚠️ 缺失字段: {', '.join(missing_fields)}")
             try:
@@ -234,61 +409,92 @@ class AdvancedPing0CCChecker:
             except:
                 ip_info["调试_页面源码"] = page_source[:500]
         
+        timing = self.collect_navigation_timing()
+        if timing:
+            ip_info["性能计时"] = timing
+        
         return ip_info
     
-    def check_ip_advanced(self, html_file="ping0.cc.html", proxy_url="http://127.0.0.1:7890", use_real_site=False, loop_index=1):
-        """高级IP检查流程 - 支持本地HTML文件和在线检测"""
+    def check_ip_advanced(self, html_file="ping0.cc.html", proxy_url="http://127.0.0.1:7890", use_real_site=False, loop_index=1,
+                          keep_driver=False, timeout=None, target_ip=None):
+        """高级IP检查流程 - 支持本地HTML文件和在线检测
+        
+        keep_driver=True 时检测结束后保留浏览器，供下一次检测直接复用（预热模式）
+        timeout 为本次检测的总时间预算（秒），覆盖浏览器启动、页面加载、验证等待和信息提取，
+        到期后看门狗强制结束浏览器，本次检测记为超时
+        target_ip 不为空时查询指定IP的 /ip/<地址> 页面，而不是当前出口IP
+        """
+        self.last_error = None
+        self.challenge_cleared = True
+        if use_real_site:
+            self._arm_watchdog(timeout)
         try:
             if use_real_site:
-                # 使用真实网站检测
+                # 使用真实网站检测，已有可用的同代理浏览器时直接复用
                 print("🌐 使用真实网站进行检测...")
-                self.setup_stealth_driver(proxy_url)
+                if not self.is_ready(proxy_url):
+                    self.close()
+                    self.setup_stealth_driver(proxy_url)
+                
+                # 页面加载和脚本执行也不能越过截止时间（通过无响应的代理访问时 get 可能一直阻塞）
+                if self.deadline is not None:
+                    self.check_deadline()
+                    self.driver.set_page_load_timeout(self.bounded_timeout(self.remaining()))
+                    self.driver.set_script_timeout(self.bounded_timeout(30))
                 
                 # 访问真实的ping0.cc网站
-                print("🎯 访问 ping0.cc...")
-                self.driver.get("https://ping0.cc")
+                url = lookup_url(target_ip)
+                print(f"🎯 访问 {url}...")
+                self.driver.get(url)
                 
                 # 等待页面加载
-                time.sleep(random.uniform(5, 8))
+                self.sleep(random.uniform(5, 8))
                 
                 # 检查并绕过机器人检测
-                self.wait_for_bot_detection_bypass()
+                self.challenge_cleared = self.wait_for_bot_detection_bypass()
                 
                 # 额外等待确保页面完全加载
                 print("⏰ 等待页面完全加载...")
-                time.sleep(10)
+                self.sleep(10)
                 
             else:
-                # 使用本地HTML文件
+                # 使用本地HTML文件 - 直接解析源码，不需要启动浏览器
                 import os
                 if not os.path.exists(html_file):
                     print(f"❌ HTML文件不存在: {html_file}")
                     return None
                 
-                self.setup_stealth_driver(proxy_url)
-                
-                # 获取HTML文件的绝对路径
-                html_path = os.path.abspath(html_file)
-                file_url = f"file://{html_path}"
-                
-                print(f"📂 加载本地HTML文件: {html_file}")
-                self.driver.get(file_url)
-                
-                # 等待页面加载
-                time.sleep(random.uniform(2, 4))
+                print(f"📂 解析本地HTML文件: {html_file}")
+                return parse_html_file(html_file, loop_index)
             
             # 提取信息
             ip_info = self.extract_ip_info_advanced(loop_index)
             
+            self.checks_on_browser += 1
+            usage = self.sample_resources()
+            if ip_info and usage:
+                ip_info["浏览器资源"] = usage
+            
             return ip_info
             
         except Exception as e:
+            if self.timed_out and not isinstance(e, CheckDeadlineExceeded):
+                # 看门狗结束浏览器后WebDriver调用出错，按超时处理
+                e = CheckDeadlineExceeded(f"检测超过时间预算: {e}")
             print(f"❌ 检查过程中出错: {e}")
+            self.last_error = e
+            # 出错后的浏览器状态不可信，不再复用
+            self.close()
             return None
         
         finally:
-            if self.driver:
-                self.driver.quit()
+            self._disarm_watchdog()
+            if not keep_driver:
+                self.close()
+            elif self.driver and self.needs_recycle():
+                print(f"♻️ 浏览器资源超限或复用次数已满，回收浏览器: {self.resource_usage}")
+                self.recycle_count += 1
+                self.close()
 
     def save_results(self, ip_info):
         """保存结果"""
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量IP查询 - 读取IP列表文件，逐个查询 ping0.cc/ip/<地址> 页面
+
+IP列表文件每行一个IP（# 开头为注释，行内可以有逗号或空白分隔的其他列，只取第一列）。
+已处理的IP追加写入检查点文件，批量查询被中断后再次运行会从中断处继续
+"""
+
+import ipaddress
+import os
+
+
+def read_ip_list(path):
+    """读取IP列表文件，返回去重后的IP列表（保持原顺序）和无效行数"""
+    ips, seen, invalid = [], set(), 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            value = line.replace(",", " ").split()[0]
+            try:
+                ip = str(ipaddress.ip_address(value))
+            except ValueError:
+                invalid += 1
+                continue
+            if ip not in seen:
+                seen.add(ip)
+                ips.append(ip)
+    return ips, invalid
+
+
+def checkpoint_path(ip_file):
+    return f"{ip_file}.checkpoint"
+
+
+class BatchCheckpoint:
+    """批量查询检查点 - 已处理IP的追加日志（每处理一个IP写一行并flush）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done.update(line.strip() for line in f if line.strip())
+        self._file = None
+
+    def __contains__(self, ip):
+        return ip in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def mark(self, ip):
+        """记录一个已处理的IP（调用方负责加锁）"""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(ip + "\n")
+        self._file.flush()
+        self.done.add(ip)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """批量查询全部完成后删除检查点"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入口模块导入耗时检查
+在独立的子进程中导入每个入口模块，测量导入耗时并检查是否提前加载了重量级依赖
+"""
+
+import json
+import os
+import subprocess
+import sys
+from config import IMPORT_BUDGET, HEAVY_MODULES
+
+# 子进程中执行的测量脚本
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module, repeat=3):
+    """测量模块导入耗时（取多次中的最小值），返回 (耗时秒数, 已加载的重量级依赖)"""
+    best, heavy = None, []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE_SCRIPT.format(module=module, heavy=tuple(HEAVY_MODULES))],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["elapsed"] < best:
+            best = result["elapsed"]
+        heavy = result["heavy"]
+    return best, heavy
+
+
+def main():
+    print("⏱️ 入口模块导入耗时检查")
+    print("=" * 60)
+
+    failed = False
+    for module, budget in IMPORT_BUDGET.items():
+        try:
+            elapsed, heavy = measure_import(module)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module}: 导入失败\n{e.stderr}")
+            failed = True
+            continue
+
+        ok = elapsed <= budget and not heavy
+        failed = failed or not ok
+        status = "✅" if ok else "❌"
+        print(f"{status} {module}: {elapsed * 1000:.1f}ms (预算 {budget * 1000:.0f}ms)")
+        if heavy:
+            print(f"   ⚠️ 导入时加载了重量级依赖: {', '.join(heavy)}")
+
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测服务模式 - 常驻进程，通过本地HTTP接口接收检测任务
+
+接口:
+  POST /jobs          提交任务 {"proxy_url": "...", "count": 1, "deadline": 120, "wait": false}
+  GET  /jobs/<任务ID>  查询任务状态和结果
+  GET  /jobs          列出任务概况
+  GET  /health        服务状态（队列长度、预热浏览器数量等）
+"""
+
+import json
+import queue
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from checker_pool import CheckerPool
+from resource_monitor import reap_orphan_browsers
+from resilience import CheckDeadlineExceeded, classify_failure
+from config import SERVICE_CONFIG, DEADLINE_CONFIG
+
+
+class CheckService:
+    """检测任务服务 - 有界队列 + 固定数量的工作线程 + 预热检查器池"""
+
+    def __init__(self, workers=None, queue_size=None, max_idle_per_proxy=None):
+        self.workers = workers or SERVICE_CONFIG["workers"]
+        self.queue = queue.Queue(maxsize=queue_size or SERVICE_CONFIG["queue_size"])
+        self.pool = CheckerPool(max_idle_per_proxy or SERVICE_CONFIG["max_idle_per_proxy"])
+        self.jobs = OrderedDict()
+        self._events = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        """启动工作线程"""
+        # 清理上次异常退出残留的浏览器进程
+        reaped = reap_orphan_browsers()
+        if reaped:
+            print(f"🧹 已清理 {reaped} 个残留浏览器进程")
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"check-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止工作线程并关闭所有预热浏览器"""
+        self._running = False
+        for _ in self._threads:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self.pool.close_all()
+        # 超时未退出的工作线程可能还持有浏览器，一并结束
+        reap_orphan_browsers(include_own=True)
+
+    def submit(self, proxy_url, count=1, deadline=None):
+        """提交检测任务，队列已满时返回None"""
+        count = max(1, min(int(count), SERVICE_CONFIG["max_checks_per_job"]))
+        now = time.time()
+        job = {
+            "任务ID": uuid.uuid4().hex[:12],
+            "状态": "排队中",
+            "代理": proxy_url,
+            "检测次数": count,
+            "提交时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "截止时间": (datetime.fromtimestamp(now + float(deadline)).strftime("%Y-%m-%d %H:%M:%S")
+                     if deadline else None),
+            "结果": [],
+        }
+
+        with self._lock:
+            self.jobs[job["任务ID"]] = job
+            self._events[job["任务ID"]] = threading.Event()
+        try:
+            self.queue.put_nowait((job["任务ID"], now + float(deadline) if deadline else None))
+        except queue.Full:
+            with self._lock:
+                del self.jobs[job["任务ID"]]
+                del self._events[job["任务ID"]]
+            return None
+
+        return job["任务ID"]
+
+    def wait(self, job_id, timeout=None):
+        """等待任务结束"""
+        event = self._events.get(job_id)
+        if event:
+            event.wait(timeout)
+
+    def get_job(self, job_id):
+        """获取任务当前状态的副本"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job, ensure_ascii=False)) if job else None
+
+    def health(self):
+        """服务状态"""
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job["状态"]] = states.get(job["状态"], 0) + 1
+        return {
+            "运行中": self._running,
+            "工作线程数": self.workers,
+            "排队任务数": self.queue.qsize(),
+            "任务状态统计": states,
+            "预热浏览器": self.pool.idle_counts(),
+            "检查器池统计": dict(self.pool.stats),
+        }
+
+    def _worker_loop(self):
+        while self._running:
+            item = self.queue.get()
+            if item is None:
+                break
+            job_id, deadline_ts = item
+            try:
+                self._run_job(job_id, deadline_ts)
+            except Exception as e:
+                self._update(job_id, 状态="失败", 错误=str(e))
+            finally:
+                self._finish(job_id)
+
+    def _run_job(self, job_id, deadline_ts):
+        with self._lock:
+            job = self.jobs[job_id]
+            proxy_url, count = job["代理"], job["检测次数"]
+
+        if deadline_ts and time.time() >= deadline_ts:
+            self._update(job_id, 状态="已过期")
+            return
+
+        self._update(job_id, 状态="运行中", 开始时间=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+        for i in range(count):
+            # 截止时间到达后不再开始新的检测
+            if deadline_ts and time.time() >= deadline_ts:
+                self._update(job_id, 状态="已过期")
+                return
+
+            # 单次检测的时间预算（含等待备用浏览器和冷启动）不超过任务的截止时间
+            acquire_start = time.time()
+            timeout = DEADLINE_CONFIG["check_seconds"]
+            if deadline_ts:
+                timeout = max(min(timeout, deadline_ts - acquire_start), 1)
+            try:
+                checker, warm_seconds, reused = self.pool.acquire(proxy_url, timeout)
+            except CheckDeadlineExceeded as e:
+                with self._lock:
+                    job["结果"].append({
+                        "成功": False,
+                        "失败分类": classify_failure(e),
+                        "复用浏览器": False,
+                        "预热启动耗时": round(time.time() - acquire_start, 3),
+                        "检测耗时": 0,
+                        "检测结果": None,
+                        "错误": str(e),
+                    })
+                continue
+            check_start = time.time()
+            ip_info, error = None, None
+            try:
+                ip_info = checker.check_ip_advanced(proxy_url=proxy_url, use_real_site=True,
+                                                    loop_index=i + 1, keep_driver=True,
+                                                    timeout=max(timeout - (check_start - acquire_start), 0.1))
+            except Exception as e:
+                error = e
+            # 停留在验证页或信息缺失的页面不算成功，其浏览器也不再复用
+            failure = classify_failure(error or checker.last_error, ip_info, checker.challenge_cleared)
+            self.pool.release(checker, reuse=failure is None)
+            if error is not None:
+                raise error
+
+            with self._lock:
+                job["结果"].append({
+                    "成功": failure is None,
+                    "失败分类": failure,
+                    "复用浏览器": reused,
+                    "预热启动耗时": round(warm_seconds, 3),
+                    "检测耗时": round(time.time() - check_start, 3),
+                    "检测结果": ip_info,
+                })
+
+        with self._lock:
+            results = job["结果"]
+            job["平均预热启动耗时"] = round(sum(r["预热启动耗时"] for r in results) / len(results), 3)
+            job["成功次数"] = sum(1 for r in results if r["成功"])
+        self._update(job_id, 状态="已完成")
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _finish(self, job_id):
+        with self._lock:
+            self.jobs[job_id]["结束时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            event = self._events.pop(job_id, None)
+
+            # 只保留最近的已结束任务，避免长期运行时内存增长
+            finished = [jid for jid, job in self.jobs.items() if "结束时间" in job]
+            for jid in finished[:max(0, len(finished) - SERVICE_CONFIG["max_finished_jobs"])]:
+                del self.jobs[jid]
+
+        if event:
+            event.set()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """任务接口请求处理器"""
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split("?", 1)[0].rstrip("/")
+
+        if path == "/health":
+            self._send_json(200, service.health())
+        elif path == "/jobs":
+            with service._lock:
+                jobs = [{key: job.get(key) for key in ("任务ID", "状态", "代理", "检测次数", "提交时间")}
+                        for job in service.jobs.values()]
+            self._send_json(200, jobs)
+        elif path.startswith("/jobs/"):
+            job = service.get_job(path[len("/jobs/"):])
+            if job:
+                self._send_json(200, job)
+            else:
+                self._send_json(404, {"错误": "任务不存在"})
+        else:
+            self._send_json(404, {"错误": "接口不存在"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            self._send_json(404, {"错误": "接口不存在"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            proxy_url = body["proxy_url"]
+            count = int(body.get("count", 1))
+            deadline = body.get("deadline")
+            deadline = float(deadline) if deadline is not None else None
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"错误": f"请求格式错误: {e}"})
+            return
+
+        job_id = service.submit(proxy_url, count, deadline)
+        if job_id is None:
+            self._send_json(503, {"错误": "任务队列已满"})
+            return
+
+        if body.get("wait"):
+            service.wait(job_id, timeout=deadline)
+            self._send_json(200, service.get_job(job_id))
+        else:
+            self._send_json(202, {"任务ID": job_id, "状态": "排队中"})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host=None, port=None, workers=None):
+    """以服务模式运行，直到收到中断信号"""
+    host = host or SERVICE_CONFIG["host"]
+    port = port if port is not None else SERVICE_CONFIG["port"]
+
+    service = CheckService(workers=workers)
+    service.start()
+
+    # SIGTERM 与 Ctrl+C 走同一条退出路径，确保浏览器被关闭
+    def handle_term(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+    httpd = ThreadingHTTPServer((host, port), _ServiceHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+
+    print("🚀 ping0.cc 检测服务已启动")
+    print(f"🌐 任务接口: http://{host}:{httpd.server_address[1]}/jobs")
+    print(f"👷 并发检测数: {service.workers}")
+    print("💡 按 Ctrl+C 停止服务")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🔄 正在停止服务...")
+    finally:
+        httpd.server_close()
+        service.stop()
+        print("✅ 服务已停止")
+
+
+if __name__ == "__main__":
+    serve()
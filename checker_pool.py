@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预热检查器池 - 按代理保存已启动浏览器的检查器实例
+取用时优先返回空闲的预热实例，没有时才冷启动新的浏览器
+
+prefetch() 设置各代理的备用浏览器目标数量后，后台线程会提前启动浏览器补足空闲实例，
+浏览器启动与当前检测、检测间隔并行进行
+"""
+
+import threading
+import time
+from advanced_checker import AdvancedPing0CCChecker
+from resilience import CheckDeadlineExceeded
+
+
+class CheckerPool:
+    """预热检查器池"""
+
+    def __init__(self, max_idle_per_proxy=2):
+        self.max_idle_per_proxy = max_idle_per_proxy
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # 备用浏览器启动结束时通知
+        self._spare_targets = {}        # 代理 -> 备用浏览器目标数量
+        self._launching = {}            # 代理 -> 后台正在启动的浏览器数量
+        self._prefetch_event = threading.Event()
+        self._prefetch_thread = None
+        self._closed = False
+        self.stats = {
+            "冷启动次数": 0,
+            "复用次数": 0,
+            "关闭次数": 0,
+            "回收次数": 0,
+            "预启动次数": 0,
+            "预启动失败次数": 0,
+        }
+
+    def acquire(self, proxy_url, timeout=None):
+        """取用一个可用的检查器，返回 (检查器, 预热启动耗时秒数, 是否复用)
+
+        timeout 为取用的时间预算（秒）：等待备用浏览器和冷启动都不会越过截止时间，
+        到期时抛出 CheckDeadlineExceeded（冷启动中的浏览器由看门狗强制结束）
+        """
+        start = time.time()
+        deadline = start + timeout if timeout else None
+
+        while True:
+            with self._lock:
+                # 备用浏览器正在启动时等它启动完成，比再冷启动一个更快
+                while not self._idle.get(proxy_url) and self._launching.get(proxy_url):
+                    if deadline is None:
+                        self._changed.wait()
+                        continue
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise CheckDeadlineExceeded("等待备用浏览器超过时间预算")
+                    self._changed.wait(remaining)
+                idle = self._idle.get(proxy_url, [])
+                checker = idle.pop() if idle else None
+
+            if checker is None:
+                break
+
+            # 空闲期间浏览器可能已经崩溃，不可用的直接丢弃
+            if checker.is_ready(proxy_url):
+                with self._lock:
+                    self.stats["复用次数"] += 1
+                return checker, time.time() - start, True
+
+            self._discard(checker)
+
+        remaining = deadline - time.time() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            raise CheckDeadlineExceeded("等待浏览器就绪超过时间预算")
+        checker = AdvancedPing0CCChecker()
+        try:
+            checker.launch(proxy_url, remaining)
+        except Exception:
+            checker.close()
+            raise
+
+        with self._lock:
+            self.stats["冷启动次数"] += 1
+        return checker, time.time() - start, False
+
+    def release(self, checker, reuse=True):
+        """归还检查器，reuse=False 或空闲数已满时关闭浏览器"""
+        # 检测结束时因资源超限已回收的浏览器（检查器已自行关闭）
+        if checker.recycle_count:
+            with self._lock:
+                self.stats["回收次数"] += checker.recycle_count
+            checker.recycle_count = 0
+
+        if reuse and checker.is_ready():
+            with self._lock:
+                idle = self._idle.setdefault(checker.proxy_url, [])
+                if len(idle) < self.max_idle_per_proxy:
+                    idle.append(checker)
+                    return
+
+        self._discard(checker)
+
+    def prefetch(self, proxy_url, count=1):
+        """为代理保持 count 个已启动的备用浏览器（后台线程启动，立即返回）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._spare_targets[proxy_url] = min(count, self.max_idle_per_proxy)
+            if self._prefetch_thread is None:
+                self._prefetch_thread = threading.Thread(target=self._prefetch_loop, name="checker-prefetch",
+                                                         daemon=True)
+                self._prefetch_thread.start()
+        self._prefetch_event.set()
+
+    def _next_prefetch(self):
+        """找出备用浏览器不足的代理，并登记为正在启动"""
+        with self._lock:
+            for proxy_url, target in self._spare_targets.items():
+                pending = len(self._idle.get(proxy_url, [])) + self._launching.get(proxy_url, 0)
+                if pending < target:
+                    self._launching[proxy_url] = self._launching.get(proxy_url, 0) + 1
+                    return proxy_url
+        return None
+
+    def _prefetch_loop(self):
+        while not self._closed:
+            proxy_url = self._next_prefetch()
+            if proxy_url is None:
+                self._prefetch_event.wait()
+                self._prefetch_event.clear()
+                continue
+
+            checker = AdvancedPing0CCChecker()
+            failed = False
+            try:
+                checker.setup_stealth_driver(proxy_url)
+            except Exception as e:
+                print(f"⚠️ 备用浏览器启动失败: {e}")
+                checker.close()
+                failed = True
+
+            with self._lock:
+                self._launching[proxy_url] -= 1
+                if failed:
+                    self.stats["预启动失败次数"] += 1
+                elif not self._closed:
+                    self._idle.setdefault(proxy_url, []).append(checker)
+                    self.stats["预启动次数"] += 1
+                    checker = None
+                self._changed.notify_all()
+
+            if failed:
+                # 启动失败时稍后再试，避免连续失败时不停地启动浏览器
+                time.sleep(5)
+            elif checker is not None:
+                # 启动期间池已关闭
+                self._discard(checker)
+
+    def idle_counts(self):
+        """各代理当前的空闲检查器数量"""
+        with self._lock:
+            return {proxy: len(idle) for proxy, idle in self._idle.items() if idle}
+
+    def close_all(self):
+        """停止预启动并关闭池中所有空闲浏览器"""
+        with self._lock:
+            self._closed = True
+            self._spare_targets.clear()
+            checkers = [checker for idle in self._idle.values() for checker in idle]
+            self._idle.clear()
+
+        self._prefetch_event.set()
+        if self._prefetch_thread is not None:
+            # 正在启动的浏览器启动完成后由预启动线程自行关闭
+            self._prefetch_thread.join(timeout=1)
+
+        for checker in checkers:
+            self._discard(checker)
+
+    def _discard(self, checker):
+        checker.close()
+        with self._lock:
+            self.stats["关闭次数"] += 1
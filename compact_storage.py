@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑二进制存储格式 (.p0cb)
+
+文件结构:
+  文件头  b"P0CB" + 版本(1字节) + 压缩方式(1字节: 0=不压缩 1=gzip 2=zstd)
+  数据流  (按压缩方式压缩) 由若干帧组成，每帧为 类型(1字节) + 长度(4字节大端) + CBOR内容
+    S 字段表帧  新增的字段名列表，字段代码为其在累计字段表中的序号
+    T 统计帧    除检测结果外的统计数据
+    R 记录帧    一条检测结果，键为字段代码
+
+检测结果中反复出现的中文字段名只在字段表中出现一次，记录本身只存字段代码和值
+"""
+
+import gzip
+import io
+import json
+import os
+import struct
+import sys
+
+MAGIC = b"P0CB"
+VERSION = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_GZIP = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "gzip": COMPRESSION_GZIP, "zstd": COMPRESSION_ZSTD}
+
+FRAME_SCHEMA = b"S"
+FRAME_STATS = b"T"
+FRAME_RECORD = b"R"
+
+COMPACT_EXTENSION = ".p0cb"
+
+# 统计帧中用于标记源文件为记录列表（如 advanced_ip_data.json）
+LIST_FORMAT_KEY = "_列表格式"
+
+
+# ---------------------------------------------------------------------------
+# CBOR (RFC 8949) 子集编解码：整数、浮点、字符串、字节串、数组、字典、布尔、null
+# ---------------------------------------------------------------------------
+
+def _cbor_head(major, value):
+    if value < 24:
+        return bytes([(major << 5) | value])
+    if value < 0x100:
+        return bytes([(major << 5) | 24, value])
+    if value < 0x10000:
+        return bytes([(major << 5) | 25]) + struct.pack(">H", value)
+    if value < 0x100000000:
+        return bytes([(major << 5) | 26]) + struct.pack(">I", value)
+    return bytes([(major << 5) | 27]) + struct.pack(">Q", value)
+
+
+def cbor_dumps(value):
+    """编码为CBOR"""
+    out = bytearray()
+    _cbor_encode(value, out)
+    return bytes(out)
+
+
+def _cbor_encode(value, out):
+    if value is None:
+        out.append(0xf6)
+    elif value is True:
+        out.append(0xf5)
+    elif value is False:
+        out.append(0xf4)
+    elif isinstance(value, int):
+        if value >= 0:
+            out += _cbor_head(0, value)
+        else:
+            out += _cbor_head(1, -1 - value)
+    elif isinstance(value, float):
+        out.append(0xfb)
+        out += struct.pack(">d", value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out += _cbor_head(3, len(data))
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        out += _cbor_head(2, len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out += _cbor_head(4, len(value))
+        for item in value:
+            _cbor_encode(item, out)
+    elif isinstance(value, dict):
+        out += _cbor_head(5, len(value))
+        for key, item in value.items():
+            _cbor_encode(key, out)
+            _cbor_encode(item, out)
+    else:
+        raise TypeError(f"不支持的数据类型: {type(value).__name__}")
+
+
+def cbor_loads(data):
+    """解码CBOR"""
+    value, offset = _cbor_decode(data, 0)
+    if offset != len(data):
+        raise ValueError("CBOR数据末尾有多余字节")
+    return value
+
+
+def _cbor_decode(data, offset):
+    initial = data[offset]
+    major, info = initial >> 5, initial & 0x1f
+    offset += 1
+
+    if major == 7:
+        if info == 20:
+            return False, offset
+        if info == 21:
+            return True, offset
+        if info in (22, 23):
+            return None, offset
+        if info == 25:
+            return struct.unpack_from(">e", data, offset)[0], offset + 2
+        if info == 26:
+            return struct.unpack_from(">f", data, offset)[0], offset + 4
+        if info == 27:
+            return struct.unpack_from(">d", data, offset)[0], offset + 8
+        raise ValueError(f"不支持的CBOR简单值: {info}")
+
+    if info < 24:
+        length = info
+    elif info == 24:
+        length, offset = data[offset], offset + 1
+    elif info == 25:
+        length, offset = struct.unpack_from(">H", data, offset)[0], offset + 2
+    elif info == 26:
+        length, offset = struct.unpack_from(">I", data, offset)[0], offset + 4
+    elif info == 27:
+        length, offset = struct.unpack_from(">Q", data, offset)[0], offset + 8
+    else:
+        raise ValueError("不支持不定长CBOR数据")
+
+    if major == 0:
+        return length, offset
+    if major == 1:
+        return -1 - length, offset
+    if major == 2:
+        return bytes(data[offset:offset + length]), offset + length
+    if major == 3:
+        return bytes(data[offset:offset + length]).decode("utf-8"), offset + length
+    if major == 4:
+        items = []
+        for _ in range(length):
+            item, offset = _cbor_decode(data, offset)
+            items.append(item)
+        return items, offset
+    if major == 5:
+        result = {}
+        for _ in range(length):
+            key, offset = _cbor_decode(data, offset)
+            result[key], offset = _cbor_decode(data, offset)
+        return result, offset
+    raise ValueError(f"不支持的CBOR类型: {major}")
+
+
+# ---------------------------------------------------------------------------
+# 压缩流
+# ---------------------------------------------------------------------------
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("使用zstd压缩需要安装zstandard: pip install zstandard")
+    return zstandard
+
+
+def _open_compressed_writer(raw, compression):
+    if compression == COMPRESSION_GZIP:
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd().ZstdCompressor().stream_writer(raw, closefd=False)
+    return raw
+
+
+def _open_compressed_reader(raw, compression):
+    if compression == COMPRESSION_GZIP:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if compression == COMPRESSION_ZSTD:
+        return _zstd().ZstdDecompressor().stream_reader(raw)
+    return raw
+
+
+# ---------------------------------------------------------------------------
+# 读写
+# ---------------------------------------------------------------------------
+
+class CompactWriter:
+    """紧凑格式流式写入器"""
+
+    def __init__(self, fileobj, compression=COMPRESSION_GZIP):
+        self.raw = fileobj
+        self.raw.write(MAGIC + bytes([VERSION, compression]))
+        self.stream = _open_compressed_writer(self.raw, compression)
+        self.codes = {}
+
+    def write_stats(self, stats):
+        """写入统计帧（不含检测结果）"""
+        self._frame(FRAME_STATS, {key: value for key, value in stats.items() if key != "检测结果"})
+
+    def write_record(self, record):
+        """写入一条检测结果，遇到新字段时先写字段表帧"""
+        new_fields = [key for key in record if key not in self.codes]
+        if new_fields:
+            for key in new_fields:
+                self.codes[key] = len(self.codes)
+            self._frame(FRAME_SCHEMA, new_fields)
+        self._frame(FRAME_RECORD, {self.codes[key]: value for key, value in record.items()})
+
+    def close(self):
+        if self.stream is not self.raw:
+            self.stream.close()
+
+    def _frame(self, frame_type, payload):
+        data = cbor_dumps(payload)
+        self.stream.write(frame_type + struct.pack(">I", len(data)) + data)
+
+
+def iter_frames(fileobj):
+    """逐帧读取，返回 ("stats", 字典) 或 ("record", 字典)"""
+    header = fileobj.read(6)
+    if len(header) < 6 or header[:4] != MAGIC:
+        raise ValueError("不是紧凑格式数据文件")
+    if header[4] != VERSION:
+        raise ValueError(f"不支持的紧凑格式版本: {header[4]}")
+
+    stream = _open_compressed_reader(fileobj, header[5])
+    fields = []
+    while True:
+        head = stream.read(5)
+        if not head:
+            break
+        if len(head) < 5:
+            raise ValueError("紧凑格式数据不完整")
+        frame_type, length = head[:1], struct.unpack(">I", head[1:])[0]
+        payload = cbor_loads(stream.read(length))
+
+        if frame_type == FRAME_SCHEMA:
+            fields.extend(payload)
+        elif frame_type == FRAME_RECORD:
+            yield "record", {fields[code]: value for code, value in payload.items()}
+        elif frame_type == FRAME_STATS:
+            yield "stats", payload
+
+
+def iter_records(path):
+    """流式读取紧凑格式文件中的检测结果"""
+    with open(path, "rb") as f:
+        for kind, payload in iter_frames(f):
+            if kind == "record":
+                yield payload
+
+
+def encode_store(data, compression=COMPRESSION_GZIP):
+    """把统计数据（字典）或记录列表编码为紧凑格式bytes"""
+    buffer = io.BytesIO()
+    writer = CompactWriter(buffer, compression)
+    if isinstance(data, list):
+        writer.write_stats({LIST_FORMAT_KEY: True})
+        records = data
+    else:
+        writer.write_stats(data)
+        records = data.get("检测结果", [])
+    for record in records:
+        writer.write_record(record)
+    writer.close()
+    return buffer.getvalue()
+
+
+def is_compact_file(path):
+    """根据文件头判断是否为紧凑格式"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+def load_store(path):
+    """读取数据文件（自动识别JSON或紧凑格式），返回与JSON文件相同的结构"""
+    if not is_compact_file(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    stats, records = {}, []
+    with open(path, "rb") as f:
+        for kind, payload in iter_frames(f):
+            if kind == "stats":
+                stats.update(payload)
+            else:
+                records.append(payload)
+
+    if stats.pop(LIST_FORMAT_KEY, False):
+        return records
+    stats["检测结果"] = records
+    return stats
+
+
+def save_store(path, data, compression="gzip"):
+    """写入数据文件，扩展名为 .p0cb 时使用紧凑格式，否则为JSON
+
+    先完成编码再原子替换，编码失败时已有的目标文件保持不变
+    """
+    from persistence import atomic_write
+
+    if path.endswith(COMPACT_EXTENSION):
+        payload = encode_store(data, COMPRESSION_NAMES[compression])
+    else:
+        payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    atomic_write(path, payload)
+
+
+def convert(source, target, compression="gzip"):
+    """在JSON和紧凑格式之间转换，方向由目标文件扩展名决定，成功时返回True"""
+    try:
+        save_store(target, load_store(source), compression)
+    except FileNotFoundError as e:
+        print(f"❌ 文件不存在: {e.filename}")
+        return False
+    except (ValueError, json.JSONDecodeError, RuntimeError) as e:
+        print(f"❌ 转换失败: {e}")
+        return False
+
+    source_size, target_size = os.path.getsize(source), os.path.getsize(target)
+    print(f"✅ 已转换: {source} ({source_size} 字节) -> {target} ({target_size} 字节, "
+          f"{target_size / max(source_size, 1) * 100:.1f}%)")
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("用法: python compact_storage.py <源文件> <目标文件> [gzip|zstd|none]")
+        sys.exit(1)
+    sys.exit(0 if convert(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "gzip") else 1)
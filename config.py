@@ -42,4 +42,123 @@ INFO_FIELDS = {
     "风控值": ["风控值", "风险", "Risk"],
     "原生IP": ["原生 IP", "原生IP", "Native"],
     "大模型检测": ["大模型检测", "AI检测"]
-} 
\ No newline at end of file
+}
+
+# 实时统计服务设置（长时间运行时可通过 http://host:port/stats 查看当前统计）
+LIVE_STATS_CONFIG = {
+    "enabled": True,       # 是否启动实时统计服务
+    "host": "127.0.0.1",   # 仅监听本地地址
+    "port": 8765,          # 监听端口
+    "min_interval": 0.5,   # 两次发布快照的最小间隔（秒），避免批量解析时频繁序列化
+}
+
+# 服务模式设置（python main.py serve）
+SERVICE_CONFIG = {
+    "host": "127.0.0.1",       # 仅监听本地地址
+    "port": 8766,              # 任务接口端口
+    "workers": 2,              # 并发检测数（同时运行的浏览器数）
+    "queue_size": 100,         # 排队任务上限，超出时拒绝提交
+    "max_idle_per_proxy": 2,   # 每个代理保留的预热浏览器数
+    "max_checks_per_job": 50,  # 单个任务允许的最大检测次数
+    "max_finished_jobs": 500,  # 保留的已结束任务数量
+}
+
+# 失败重试设置（指数退避：base_delay * 2^重试序号，不超过 max_delay）
+RETRY_CONFIG = {
+    "max_retries": 2,      # 单次检测失败后的最大重试次数
+    "base_delay": 3,       # 首次重试前等待（秒）
+    "max_delay": 60,       # 重试等待上限（秒）
+    "jitter": 0.3,         # 随机抖动比例，避免多个实例同时重试
+}
+
+# 代理熔断设置（连续失败达到阈值后暂停该代理，冷却结束后先做一次探测）
+CIRCUIT_BREAKER_CONFIG = {
+    "failure_threshold": 3,   # 连续失败多少次后熔断
+    "cooldown": 60,           # 首次熔断冷却时间（秒）
+    "max_cooldown": 900,      # 探测连续失败时冷却时间翻倍的上限（秒）
+}
+
+# 入口模块导入耗时预算（秒），运行 python check_import_budget.py 检查
+# 这些入口在导入时不应加载浏览器和表格相关的重量级依赖
+IMPORT_BUDGET = {
+    "main": 0.3,
+    "generate_report_table": 0.3,
+}
+HEAVY_MODULES = ("selenium", "webdriver_manager", "pandas", "openpyxl")
+
+# 滚动窗口统计设置（按分钟/小时分桶，用于最近1小时/24小时/7天的统计）
+ROLLING_STATS_CONFIG = {
+    "minute_buckets": 120,   # 保留的分钟桶数量
+    "hour_buckets": 192,     # 保留的小时桶数量（8天）
+    "windows": {             # 报告中展示的时间窗口（秒）
+        "最近1小时": 3600,
+        "最近24小时": 86400,
+        "最近7天": 604800,
+    },
+}
+
+# 概率统计设置（固定内存估算独立IP/ASN/网段数和重复率，适用于百万级IP池）
+SKETCH_CONFIG = {
+    "hll_precision": 12,        # HyperLogLog精度，寄存器数为2^精度，标准误差约 1.04/sqrt(2^精度)
+    "bloom_capacity": 1000000,  # 布隆过滤器预期容纳的IP数量
+    "bloom_error_rate": 0.01,   # 布隆过滤器误判率
+    "ipv4_prefix": 24,          # 统计独立网段时IPv4的前缀长度
+    "ipv6_prefix": 48,          # 统计独立网段时IPv6的前缀长度
+}
+
+# 数据文件写入设置（后台线程成组提交，检测循环不等待磁盘）
+PERSISTENCE_CONFIG = {
+    "batch_size": 10,      # 累积多少条检测记录提交一次
+    "interval_ms": 1000,   # 最长提交间隔（毫秒），崩溃时最多丢失这段时间内的记录
+    "queue_size": 1000,    # 待提交队列上限，队列满时合并到下一次提交
+    "fsync": True,         # 提交时是否fsync，保证掉电后数据文件完整
+    "delta_results": True, # 同一IP的重复观测只保存变化的字段（见 delta_store.py）
+}
+
+# 浏览器资源限制（需要安装psutil，未安装时只做基本的进程清理）
+BROWSER_RESOURCE_CONFIG = {
+    "max_rss_mb": 1500,             # 浏览器进程树内存上限（MB），超过后回收浏览器
+    "max_children": 40,             # 浏览器子进程数上限
+    "max_checks_per_browser": 50,   # 预热复用时单个浏览器最多执行的检测次数
+    "profile_prefix": "p0cc-chrome-",  # 浏览器临时配置目录前缀，用于识别本工具启动的进程
+}
+
+# 备用浏览器预启动设置（真实网站检测时，下一次检测的浏览器在本次检测期间后台启动）
+PREWARM_CONFIG = {
+    "spare_browsers": 1,    # 保持的备用浏览器数量，0为不预启动
+}
+
+# 多代理自适应调度设置（指定多个代理时生效）
+BANDIT_CONFIG = {
+    "risk_weight": 0.7,             # 质量得分中风控值的权重
+    "native_weight": 0.3,           # 质量得分中原生IP的权重
+    "min_checks": 3,                # 每个代理至少检测的次数
+    "max_checks_per_proxy": 30,     # 单个代理最多检测的次数
+    "ci_width": 0.2,                # 质量得分置信区间宽度小于该值时视为已明确
+    "prior_variance": 0.083,        # 得分方差的先验（0~1均匀分布的方差）
+    "prior_weight": 5,              # 先验方差相当于的检测次数
+    "z": 1.96,                      # 置信区间系数（1.96 对应 95%）
+}
+
+# 单次检测截止时间（覆盖浏览器启动、页面加载、验证等待和信息提取的全部阶段）
+DEADLINE_CONFIG = {
+    "check_seconds": 90,    # 单次检测的总时间预算（秒），超时后强制结束浏览器并记为超时
+    "sample_size": 1000,    # 检测耗时分位数统计保留的样本数（蓄水池抽样）
+}
+
+# 批量IP查询设置（main.py batch）
+BATCH_CONFIG = {
+    "workers": 3,           # 同时查询的浏览器数量
+}
+
+# 代理轮换感知调度：从出口IP的变化学习轮换周期，把检测安排在预计轮换之后
+ROTATION_CONFIG = {
+    "enabled": True,            # 关闭后始终使用固定检测间隔
+    "min_samples": 3,           # 至少观测到多少次轮换才开始按周期调度
+    "max_samples": 50,          # 每个代理保留的最近轮换时间数量
+    "per_connection_ratio": 0.9,  # IP变化率达到该比例视为每次连接轮换，不额外等待
+    "margin_seconds": 5,        # 在预计轮换时间之后多等待的秒数（覆盖检测耗时的波动）
+    "margin_fraction": 0.03,    # 另外按周期的该比例多等待（覆盖周期估计误差）
+    "min_delay": 1,             # 最短检测间隔（秒）
+    "max_wait": 600,            # 最长等待（秒）
+}
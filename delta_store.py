@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测结果增量存储 - 同一IP的重复观测只保存变化的字段
+
+每个IP第一次出现时保存完整记录，之后的记录只保存IP地址和与该IP上一次观测相比发生变化的字段
+（检测时间、循环索引，以及风控值、IP类型等的变化），并带有 "_增量" 标记；
+上一次有、这一次没有的字段记在 "_删除字段" 中。
+读取时用 expand_results() 按顺序还原完整记录，旧版本的完整记录原样返回
+"""
+
+DELTA_KEY = "_增量"
+REMOVED_KEY = "_删除字段"
+
+# 风控历史中跟踪的字段
+HISTORY_FIELDS = ("风控值", "风控等级", "IP类型", "原生IP")
+
+
+def is_delta(record):
+    return bool(record.get(DELTA_KEY))
+
+
+class DeltaEncoder:
+    """增量编码器，保存每个IP最近一次观测的完整记录"""
+
+    def __init__(self):
+        self.latest = {}
+
+    def encode(self, record):
+        """返回用于保存的记录（首次出现的IP为完整记录，否则为增量记录）"""
+        ip = record.get("IP地址")
+        base = self.latest.get(ip) if ip else None
+        if ip:
+            self.latest[ip] = record
+        if base is None:
+            return record
+
+        delta = {"IP地址": ip, DELTA_KEY: True}
+        for key, value in record.items():
+            if key not in base or base[key] != value:
+                delta[key] = value
+        removed = [key for key in base if key not in record]
+        if removed:
+            delta[REMOVED_KEY] = removed
+        return delta
+
+    def expand(self, stored):
+        """还原一条保存的记录并更新该IP的最近观测"""
+        if not is_delta(stored):
+            ip = stored.get("IP地址")
+            if ip:
+                self.latest[ip] = stored
+            return stored
+
+        ip = stored["IP地址"]
+        record = dict(self.latest.get(ip, {}))
+        for key in stored.get(REMOVED_KEY, []):
+            record.pop(key, None)
+        for key, value in stored.items():
+            if key not in (DELTA_KEY, REMOVED_KEY):
+                record[key] = value
+        self.latest[ip] = record
+        return record
+
+    def reencode(self, stored_results):
+        """按顺序读取已保存的记录（完整或增量），返回统一增量编码后的列表
+
+        用于加载旧版本的完整记录数据文件，同时重建每个IP的最近观测
+        """
+        reader = DeltaEncoder()
+        return [self.encode(reader.expand(stored)) for stored in stored_results]
+
+
+def expand_results(stored_results):
+    """按顺序还原完整检测记录（生成器）"""
+    reader = DeltaEncoder()
+    for stored in stored_results:
+        yield reader.expand(stored)
+
+
+def last_record(stored_results):
+    """还原最后一条检测记录，没有记录时返回None"""
+    record = None
+    for record in expand_results(stored_results):
+        pass
+    return record
+
+
+def encode_results(records):
+    """把完整检测记录列表编码为增量存储形式"""
+    encoder = DeltaEncoder()
+    return [encoder.encode(record) for record in records]
+
+
+def risk_history(stored_results):
+    """每个IP的风控历史：{IP: [{检测时间, 风控值, 风控等级, IP类型, 原生IP, 观测次数}, ...]}
+
+    连续相同的观测合并为一条，观测次数为该状态持续的检测次数
+    """
+    history = {}
+    for record in expand_results(stored_results):
+        ip = record.get("IP地址")
+        if not ip:
+            continue
+        state = {field: record.get(field) for field in HISTORY_FIELDS}
+        entries = history.setdefault(ip, [])
+        if entries and all(entries[-1][field] == state[field] for field in HISTORY_FIELDS):
+            entries[-1]["观测次数"] += 1
+            entries[-1]["最后检测时间"] = record.get("检测时间")
+            continue
+        entries.append(dict(state, 检测时间=record.get("检测时间"), 最后检测时间=record.get("检测时间"), 观测次数=1))
+    return history
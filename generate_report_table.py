@@ -6,11 +6,19 @@ IP池质量检测结果表格生成器
 """
 
 import json
-import pandas as pd
+import sys
 from datetime import datetime
 import os
 import re
 import ipaddress
+from rolling_stats import RollingWindowStats
+from compact_storage import load_store
+from delta_store import expand_results, risk_history
+
+def _pandas():
+    """延迟导入pandas - 只在真正生成表格时加载，读取和导出CSV等轻量命令不受影响"""
+    import pandas as pd
+    return pd
 
 def is_valid_ip(ip_str):
     """验证IP地址是否有效"""
@@ -36,15 +44,19 @@ def extract_risk_value(risk_str):
     return 0
 
 def load_detection_results(json_file='ip_pool_quality.json'):
-    """加载检测结果数据"""
+    """加载检测结果数据（支持JSON和紧凑二进制格式）"""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_store(json_file)
+        # advanced_ip_data.json 等记录列表文件，包装成统计数据结构
+        if isinstance(data, list):
+            data = {'总检测次数': len(data), '成功检测次数': len(data), '检测结果': data}
+        # 同一IP的重复观测按增量保存，这里还原为完整记录
+        data['检测结果'] = list(expand_results(data.get('检测结果', [])))
         return data
     except FileNotFoundError:
         print(f"❌ 文件 {json_file} 不存在")
         return None
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, ValueError):
         print(f"❌ 文件 {json_file} 格式错误")
         return None
 
@@ -118,9 +130,78 @@ def create_results_table(data):
         table_data.append(row)
     
     # 创建DataFrame
-    df = pd.DataFrame(table_data)
+    df = _pandas().DataFrame(table_data)
     return df
 
+def percentile(values, pct):
+    """计算百分位数（线性插值）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def create_latency_table(data):
+    """创建网络耗时表格 - 按代理和ASN统计连接耗时、首字节耗时的P50/P95/P99"""
+    if not data or '检测结果' not in data:
+        return None
+    
+    # 耗时是每次检测的属性，使用全部带计时的记录而不是去重后的结果
+    groups = {}
+    for result in data['检测结果']:
+        timing = result.get('性能计时')
+        if not isinstance(timing, dict):
+            continue
+        for group_type, key in (('代理', result.get('代理') or '未知'), ('ASN', result.get('ASN') or '未知')):
+            samples = groups.setdefault((group_type, key), {'连接': [], '首字节': [], '传输字节': []})
+            for metric in samples:
+                if isinstance(timing.get(metric), (int, float)):
+                    samples[metric].append(timing[metric])
+    
+    if not groups:
+        return None
+    
+    table_data = []
+    for (group_type, key), samples in sorted(groups.items()):
+        row = {'分组类型': group_type, '分组': key, '样本数': len(samples['首字节'])}
+        for metric in ('连接', '首字节'):
+            for pct in (50, 95, 99):
+                value = percentile(samples[metric], pct)
+                row[f'{metric}P{pct}(ms)'] = round(value, 1) if value is not None else None
+        if samples['传输字节']:
+            row['平均传输字节'] = round(sum(samples['传输字节']) / len(samples['传输字节']))
+        table_data.append(row)
+    
+    return _pandas().DataFrame(table_data)
+
+def create_risk_history_table(data):
+    """创建IP风控历史表格 - 只列出风控值、风控等级、IP类型或原生IP发生过变化的IP"""
+    if not data or '检测结果' not in data:
+        return None
+    
+    table_data = []
+    for ip, entries in risk_history(data['检测结果']).items():
+        if len(entries) < 2:
+            continue
+        for index, entry in enumerate(entries, 1):
+            table_data.append({
+                'IP地址': ip,
+                '阶段': index,
+                '开始时间': entry['检测时间'],
+                '结束时间': entry['最后检测时间'],
+                '观测次数': entry['观测次数'],
+                '风控值': entry['风控值'],
+                '风控等级': entry['风控等级'],
+                'IP类型': entry['IP类型'],
+                '原生IP': entry['原生IP'],
+            })
+    
+    if not table_data:
+        return None
+    return _pandas().DataFrame(table_data)
+
 def create_summary_table(data, df_results=None):
     """创建统计摘要表格"""
     if not data:
@@ -210,17 +291,35 @@ def create_summary_table(data, df_results=None):
             percentage = (count / data.get('成功检测次数', 1)) * 100
             summary_data.append(['原生IP分布', native_type, f'{count} ({percentage:.1f}%)'])
     
-    df_summary = pd.DataFrame(summary_data, columns=['分类', '项目', '数值'])
+    # 去重估计（概率统计，固定内存，适用于超大IP池）
+    estimates = data.get('去重估计')
+    if estimates:
+        summary_data.append(['去重估计', '独立IP数(估算)', estimates.get('独立IP数', 0)])
+        summary_data.append(['', '独立ASN数(估算)', estimates.get('独立ASN数', 0)])
+        summary_data.append(['', '独立网段数(估算)', estimates.get('独立网段数', 0)])
+        summary_data.append(['', '重复观测率', estimates.get('重复率', '0.0%')])
+    
+    # 滚动窗口统计（基于分桶计数，不需要扫描检测结果）
+    if data.get('时间窗口统计'):
+        rolling = RollingWindowStats(data['时间窗口统计'])
+        for name, window in rolling.summaries().items():
+            summary_data.append([f'滚动窗口({name})', '检测次数', window['检测次数']])
+            summary_data.append(['', '成功率', window['成功率']])
+            summary_data.append(['', '平均风控值', f"{window['平均风控值']}%"])
+            summary_data.append(['', '原生IP占比', window['原生IP占比']])
+            summary_data.append(['', '新IP占比', window['新IP占比']])
+    
+    df_summary = _pandas().DataFrame(summary_data, columns=['分类', '项目', '数值'])
     return df_summary
 
-def export_to_excel(df_results, df_summary, filename=None):
+def export_to_excel(df_results, df_summary, filename=None, df_latency=None, df_history=None):
     """导出到Excel文件"""
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f'IP检测结果报告_{timestamp}.xlsx'
     
     try:
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        with _pandas().ExcelWriter(filename, engine='openpyxl') as writer:
             # 写入检测结果
             if df_results is not None:
                 df_results.to_excel(writer, sheet_name='检测结果明细', index=False)
@@ -228,6 +327,14 @@ def export_to_excel(df_results, df_summary, filename=None):
             # 写入统计摘要
             if df_summary is not None:
                 df_summary.to_excel(writer, sheet_name='统计摘要', index=False)
+            
+            # 写入网络耗时
+            if df_latency is not None:
+                df_latency.to_excel(writer, sheet_name='网络耗时', index=False)
+            
+            # 写入IP风控历史
+            if df_history is not None:
+                df_history.to_excel(writer, sheet_name='IP风控历史', index=False)
         
         print(f"✅ Excel报告已生成: {filename}")
         return filename
@@ -252,7 +359,7 @@ def export_to_csv(df_results, filename=None):
         print(f"❌ 生成CSV文件失败: {e}")
         return None
 
-def print_table_to_console(df_results, df_summary, max_rows=20):
+def print_table_to_console(df_results, df_summary, max_rows=20, df_latency=None, df_history=None):
     """在控制台打印表格"""
     print("\n" + "="*80)
     print("📊 IP池质量检测结果报告 (已去重)")
@@ -284,6 +391,16 @@ def print_table_to_console(df_results, df_summary, max_rows=20):
         print(f"   • 最高风控值: {df_results['风控值(数字)'].max()}%")
         print(f"   • 最低风控值: {df_results['风控值(数字)'].min()}%")
     
+    if df_latency is not None:
+        print("\n🌐 网络耗时 (按代理/ASN):")
+        print("-"*80)
+        print(df_latency.to_string(index=False))
+    
+    if df_history is not None:
+        print(f"\n📉 IP风控历史 ({df_history['IP地址'].nunique()} 个IP的风控信息发生过变化):")
+        print("-"*80)
+        print(df_history.head(max_rows).to_string(index=False, max_colwidth=25))
+    
     print("\n" + "="*80)
 
 def main():
@@ -291,9 +408,9 @@ def main():
     print("🚀 IP池质量检测结果表格生成器")
     print("="*50)
     
-    # 加载数据
+    # 加载数据（可通过命令行参数指定数据文件）
     print("📂 加载检测数据...")
-    data = load_detection_results()
+    data = load_detection_results(sys.argv[1] if len(sys.argv) > 1 else 'ip_pool_quality.json')
     
     if data is None:
         return
@@ -307,8 +424,14 @@ def main():
     print("📈 生成统计摘要表格...")
     df_summary = create_summary_table(data, df_results)
     
+    print("🌐 生成网络耗时表格...")
+    df_latency = create_latency_table(data)
+    
+    print("📉 生成IP风控历史表格...")
+    df_history = create_risk_history_table(data)
+    
     # 在控制台显示
-    print_table_to_console(df_results, df_summary)
+    print_table_to_console(df_results, df_summary, df_latency=df_latency, df_history=df_history)
     
     # 询问用户是否要导出文件
     print("\n📁 文件导出选项:")
@@ -321,7 +444,7 @@ def main():
         choice = input("请选择 (1-4): ").strip()
         
         if choice in ['1', '3']:
-            export_to_excel(df_results, df_summary)
+            export_to_excel(df_results, df_summary, df_latency=df_latency, df_history=df_history)
         
         if choice in ['2', '3']:
             export_to_csv(df_results)
@@ -337,7 +460,7 @@ def main():
 if __name__ == "__main__":
     # 检查是否安装了pandas
     try:
-        import pandas as pd
+        _pandas()
     except ImportError:
         print("❌ 缺少pandas库，请安装: pip install pandas openpyxl")
         exit(1)
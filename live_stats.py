@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时统计服务 - 在后台线程中通过本地HTTP接口提供统计快照
+检测循环每次更新统计后发布一份已序列化的快照，读取方只拿到不可变的bytes，
+既不会阻塞检测循环，也不会触发任何文件读写
+"""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _LiveStatsHandler(BaseHTTPRequestHandler):
+    """统计快照请求处理器"""
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path not in ("/", "/stats"):
+            self.send_error(404, "Not Found")
+            return
+
+        body = self.server.snapshot
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不在控制台输出访问日志，避免干扰检测进度信息
+        pass
+
+
+class LiveStatsServer:
+    """实时统计HTTP服务"""
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        """在后台线程中启动服务，失败时返回False"""
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), _LiveStatsHandler)
+        except OSError as e:
+            print(f"⚠️ 实时统计服务启动失败: {e}")
+            self.httpd = None
+            return False
+
+        self.httpd.daemon_threads = True
+        self.httpd.snapshot = b"{}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="live-stats", daemon=True)
+        self.thread.start()
+        print(f"📡 实时统计服务: http://{self.host}:{self.httpd.server_address[1]}/stats")
+        return True
+
+    @property
+    def running(self):
+        """服务是否正在运行"""
+        return self.httpd is not None
+
+    def publish(self, snapshot):
+        """发布新的统计快照（字典在这里一次性序列化为不可变的bytes）"""
+        if not self.httpd:
+            return
+
+        snapshot = dict(snapshot)
+        snapshot["快照时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # 整体替换引用，读取线程要么拿到旧快照，要么拿到新快照
+        self.httpd.snapshot = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+
+    def stop(self):
+        """停止服务"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -5,26 +5,59 @@
 通过重复访问ping0.cc检测不同IP的质量
 """
 
+import argparse
+import copy
+import csv
 import json
 import time
 import os
+import queue
 import signal
+import socket
 import sys
+import threading
 from datetime import datetime
-from advanced_checker import AdvancedPing0CCChecker
+from config import LIVE_STATS_CONFIG, PREWARM_CONFIG, PERSISTENCE_CONFIG, DEADLINE_CONFIG, BATCH_CONFIG, \
+    ROTATION_CONFIG
+from live_stats import LiveStatsServer
+from rolling_stats import RollingWindowStats, parse_risk_value
+from sketches import PoolSketches, ReservoirSample
+from merge_stats import ensure_mergeable
+from persistence import WriteBehindWriter, atomic_write
+from compact_storage import load_store, encode_store, COMPACT_EXTENSION
+from resilience import (RetryPolicy, CircuitBreaker, classify_failure, CheckDeadlineExceeded,
+                        FAILURE_CIRCUIT_OPEN, FAILURE_PARSE_MISS)
+from proxy_bandit import ProxyBandit
+from delta_store import DeltaEncoder, expand_results, last_record
+from resource_monitor import (reap_orphan_browsers, new_resource_stats, record_usage,
+                              describe_resource_stats)
+from rotation import RotationEstimator, new_rotation_state
 
 class IPPoolQualityAnalyzer:
     """IP池质量分析器"""
     
     def __init__(self, data_file='ip_pool_quality.json', max_checks=100, delay_between_checks=5, 
-                 proxy_url="http://127.0.0.1:7890", use_real_site=True):
+                 proxy_url="http://127.0.0.1:7890", use_real_site=True, live_stats_port=None,
+                 html_source="ping0.cc.html", parse_workers=None, spare_browsers=None, proxy_urls=None,
+                 check_timeout=None, batch_file=None, batch_workers=None, rotation_aware=None):
         self.data_file = data_file
         self.max_checks = max_checks
         self.delay_between_checks = delay_between_checks
-        self.proxy_url = proxy_url
+        # 指定多个代理时按质量估计自适应分配检测（见 proxy_bandit.py）
+        self.proxy_urls = list(proxy_urls) if proxy_urls else [proxy_url]
+        self.proxy_url = self.proxy_urls[0]
         self.use_real_site = use_real_site
+        self.html_source = html_source        # 本地模式：HTML文件、目录或通配符
+        self.parse_workers = parse_workers    # 本地模式：并行解析进程数，None为CPU核数
+        self.spare_browsers = PREWARM_CONFIG["spare_browsers"] if spare_browsers is None else spare_browsers
+        self.check_timeout = check_timeout or DEADLINE_CONFIG["check_seconds"]  # 单次检测总时间预算（秒）
+        self.batch_file = batch_file          # 批量查询模式：IP列表文件
+        self.batch_workers = batch_workers or BATCH_CONFIG["workers"]
+        # 按学习到的代理轮换周期安排检测，关闭时始终使用固定检测间隔
+        self.rotation_aware = ROTATION_CONFIG["enabled"] if rotation_aware is None else rotation_aware
         self.current_count = 0
         self.total_stats = {
+            "主机": socket.gethostname(),
             "检测开始时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "总检测次数": 0,
             "成功检测次数": 0,
@@ -35,41 +68,262 @@ class IPPoolQualityAnalyzer:
             "ASN分布统计": {},
             "原生IP统计": {},
             "平均风控值": 0,
+            "风控值总和": 0,
+            "风控值计数": 0,
+            "失败分类统计": {},
+            "重试次数": 0,
+            "熔断器状态": {},
+            "时间窗口统计": {},
+            "浏览器资源统计": new_resource_stats(),
+            "耗时统计": {},
+            "代理评估": {},
+            "检测耗时分布": {},
+            "轮换估计": {},
             "检测结果": []
         }
         
+        # 滚动窗口统计，直接读写 total_stats["时间窗口统计"]
+        self.rolling = RollingWindowStats(self.total_stats["时间窗口统计"])
+        
+        # 检测结果增量编码（同一IP的重复观测只保存变化的字段），最近一次完整检测结果用于实时快照
+        self.result_encoder = DeltaEncoder() if PERSISTENCE_CONFIG.get("delta_results", True) else None
+        self.last_result = None
+        
+        # 独立IP/ASN/网段估算和重复观测统计（固定内存，写文件时序列化到 "概率统计"）
+        self.sketches = PoolSketches()
+        
+        # 每次检测（含失败和超时）总耗时的蓄水池样本，用于P50/P95/P99
+        self.durations = ReservoirSample(self.total_stats["检测耗时分布"])
+        
+        # 失败重试策略和按代理的熔断器
+        self.retry_policy = RetryPolicy()
+        self.breakers = {}
+        
+        # 各代理的质量估计，多个代理时用于调度
+        self.bandit = ProxyBandit(self.proxy_urls, self.total_stats["代理评估"])
+        self._planned_proxy = None
+        
+        # 正在执行检测的检查器，退出时确保浏览器被关闭
+        self.active_checker = None
+        
+        # 备用浏览器池（第一次真实网站检测时创建），退出时关闭其中的浏览器
+        self.spare_pool = None
+        
+        # 批量查询的浏览器池和停止标志
+        self.batch_pool = None
+        self._batch_stop = threading.Event()
+        
+        # 统计数据锁，检测循环写入、实时统计服务发布快照时使用
+        self._lock = threading.RLock()
+        
+        # 实时统计服务（端口为None时使用配置文件中的设置）
+        self.live_stats_server = None
+        self._last_publish = 0
+        if LIVE_STATS_CONFIG.get("enabled"):
+            port = live_stats_port if live_stats_port is not None else LIVE_STATS_CONFIG.get("port", 8765)
+            self.live_stats_server = LiveStatsServer(LIVE_STATS_CONFIG.get("host", "127.0.0.1"), port)
+        
+        # 后台写入线程，run() 中启动；未启动时 save_data 同步写文件
+        self.writer = WriteBehindWriter(self.data_file, self.serialize_state)
+        
         # 设置信号处理器，支持优雅退出
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
     
     def signal_handler(self, signum, frame):
-        """处理退出信号"""
+        """处理退出信号 - 只中断检测循环，保存由 run() 的收尾流程统一完成，
+        避免在信号处理函数中写文件与正在进行的保存交错"""
         print(f"\n🔄 接收到退出信号，正在保存数据...")
-        self.save_final_stats()
-        print("✅ 数据已保存，程序退出")
-        sys.exit(0)
+        raise KeyboardInterrupt
     
     def load_existing_data(self):
         """加载现有数据"""
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and "检测结果" in data:
-                        self.total_stats = data
-                        self.current_count = len(data.get("检测结果", []))
-                        print(f"📂 加载现有数据，已检测 {self.current_count} 个IP")
+                # 自动识别JSON或紧凑格式
+                data = load_store(self.data_file)
+                if isinstance(data, dict) and "检测结果" in data:
+                    # 旧版本数据文件缺少的统计项补齐（风控值总和/计数和概率统计从检测结果中重新计算）
+                    ensure_mergeable(data)
+                    for key, value in self.total_stats.items():
+                        data.setdefault(key, value)
+                    if self.result_encoder:
+                        # 旧版本的完整记录统一转换为增量编码，同时重建每个IP的最近观测
+                        data["检测结果"] = self.result_encoder.reencode(data["检测结果"])
+                    self.last_result = last_record(data["检测结果"])
+                    self.total_stats = data
+                    self.rolling = RollingWindowStats(self.total_stats["时间窗口统计"])
+                    self.sketches = PoolSketches(self.total_stats.get("概率统计"))
+                    self.bandit = ProxyBandit(self.proxy_urls, self.total_stats["代理评估"])
+                    self.durations = ReservoirSample(self.total_stats["检测耗时分布"])
+                    self.current_count = len(data.get("检测结果", []))
+                    print(f"📂 加载现有数据，已检测 {self.current_count} 个IP")
+                    self.publish_snapshot()
             except Exception as e:
                 print(f"⚠️ 加载现有数据失败: {e}")
     
-    def update_statistics(self, ip_info):
+    def get_breaker(self, proxy_url):
+        """获取代理对应的熔断器"""
+        if proxy_url not in self.breakers:
+            self.breakers[proxy_url] = CircuitBreaker()
+        return self.breakers[proxy_url]
+    
+    def get_spare_pool(self):
+        """备用浏览器池，未启用预启动时为None"""
+        if not self.use_real_site or self.spare_browsers <= 0:
+            return None
+        if self.spare_pool is None:
+            from checker_pool import CheckerPool
+            self.spare_pool = CheckerPool(max_idle_per_proxy=self.spare_browsers)
+        return self.spare_pool
+    
+    def start_checker(self, proxy_url, timeout=None):
+        """取得本次检测使用的检查器，返回 (检查器, 等待浏览器就绪的秒数, 是否使用了备用浏览器)
+        
+        启用预启动时从备用浏览器池取用，并立即开始为下一次检测启动备用浏览器；
+        等待备用浏览器和冷启动浏览器都不超过 timeout 秒
+        """
+        # selenium 等浏览器依赖只在真正发起检测时加载
+        from advanced_checker import AdvancedPing0CCChecker
+        
+        pool = self.get_spare_pool()
+        if pool is None:
+            # 浏览器在 check_ip_advanced 中启动
+            return AdvancedPing0CCChecker(), 0, False
+        
+        checker, wait_seconds, prewarmed = pool.acquire(proxy_url, timeout)
+        # 为下一次检测的代理启动备用浏览器（最后一次检测不再预启动）
+        remaining = self.max_checks - self.current_count - 1
+        next_proxy = self.plan_next_proxy() if remaining > 0 else None
+        if next_proxy != proxy_url:
+            pool.prefetch(proxy_url, 0)
+        if next_proxy:
+            pool.prefetch(next_proxy, self.spare_browsers)
+        return checker, wait_seconds, prewarmed
+    
+    def plan_next_proxy(self):
+        """提前确定下一次检测使用的代理（多代理时在本次检测期间决定，以便预启动对应的浏览器）"""
+        if len(self.proxy_urls) == 1:
+            return self.proxy_url
+        # 熔断冷却中的代理暂不分配
+        exclude = {proxy for proxy in self.proxy_urls if self.get_breaker(proxy).retry_after() > 0}
+        self._planned_proxy = self.bandit.choose(exclude)
+        return self._planned_proxy
+    
+    def next_proxy(self):
+        """下一次检测使用的代理，所有代理的质量都已明确时返回None"""
+        if len(self.proxy_urls) == 1:
+            return self.proxy_url
+        
+        candidates = self.bandit.candidates()
+        if not candidates:
+            return None
+        
+        planned, self._planned_proxy = self._planned_proxy, None
+        if planned in candidates and self.get_breaker(planned).retry_after() <= 0:
+            return planned
+        
+        exclude = {proxy for proxy in candidates if self.get_breaker(proxy).retry_after() > 0}
+        proxy_url = self.bandit.choose(exclude)
+        if proxy_url is None:
+            # 剩余的代理都在熔断冷却中，选最早恢复的一个
+            proxy_url = min(candidates, key=lambda proxy: self.get_breaker(proxy).retry_after())
+        return proxy_url
+    
+    def check_with_retry(self, proxy_url, loop_index):
+        """执行一次检测，失败时按退避策略重试，返回 (检测结果, 失败分类)"""
+        breaker = self.get_breaker(proxy_url)
+        failure = None
+        
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not breaker.allow():
+                return None, failure or FAILURE_CIRCUIT_OPEN
+            
+            checker = None
+            ip_info, error = None, None
+            wait_seconds, prewarmed = 0, False
+            attempt_start = start = time.time()
+            try:
+                # 创建检查器实例（或取用已启动的备用浏览器）
+                checker, wait_seconds, prewarmed = self.start_checker(proxy_url, self.check_timeout)
+                self.active_checker = checker
+                start = time.time()
+                
+                # 等待浏览器就绪的时间也计入本次检测的时间预算
+                remaining = self.check_timeout - (start - attempt_start)
+                if remaining <= 0:
+                    raise CheckDeadlineExceeded("等待浏览器就绪超过时间预算")
+                
+                # 执行检测 - 支持代理，传递循环索引（本地模式由 run_local 处理）
+                ip_info = checker.check_ip_advanced(
+                    proxy_url=proxy_url,
+                    use_real_site=True,
+                    loop_index=loop_index,
+                    timeout=remaining
+                )
+            except Exception as e:
+                error = e
+                if checker:
+                    checker.close()
+            self.active_checker = None
+            if checker:
+                self.record_recycles(checker)
+            with self._lock:
+                self.durations.add(round(time.time() - attempt_start, 2))
+            
+            failure = classify_failure(error or (checker and checker.last_error), ip_info,
+                                       checker.challenge_cleared if checker else True)
+            if failure is None:
+                breaker.record_success()
+                # 记录所用代理，报告中按代理分组统计网络耗时
+                ip_info["代理"] = proxy_url
+                # 浏览器启动耗时与检测耗时分开记录；使用备用浏览器时启动耗时已在后台消化
+                launched_inline = self.spare_pool is None
+                launch_seconds = checker.launch_seconds
+                ip_info["浏览器启动耗时"] = round(launch_seconds, 2)
+                ip_info["启动等待耗时"] = round(launch_seconds if launched_inline else wait_seconds, 2)
+                ip_info["检测耗时"] = round(time.time() - start - (launch_seconds if launched_inline else 0), 2)
+                ip_info["备用浏览器"] = prewarmed
+                return ip_info, None
+            
+            breaker.record_failure(failure)
+            print(f"⚠️ 检测失败: {failure}")
+            
+            if not self.retry_policy.should_retry(attempt, failure) or not breaker.allow():
+                break
+            
+            delay = self.retry_policy.delay(attempt)
+            with self._lock:
+                self.total_stats["重试次数"] += 1
+            print(f"🔁 {delay:.1f}秒后进行第 {attempt + 1} 次重试...")
+            time.sleep(delay)
+        
+        return None, failure
+    
+    def update_statistics(self, ip_info, failure=None):
         """更新统计信息"""
+        new_ip = self.sketches.observe(ip_info) if ip_info else False
+        self.rolling.record(ip_info, new_ip=new_ip)
+        
         if not ip_info:
             self.total_stats["失败检测次数"] += 1
+            failure = failure or "未知错误"
+            self.total_stats["失败分类统计"][failure] = self.total_stats["失败分类统计"].get(failure, 0) + 1
             return
         
         self.total_stats["成功检测次数"] += 1
         
+        # 浏览器资源占用
+        record_usage(self.total_stats["浏览器资源统计"], ip_info.get("浏览器资源"))
+        
+        # 浏览器启动耗时、等待浏览器就绪耗时与检测耗时（保存总和，可精确合并）
+        if "检测耗时" in ip_info:
+            timing = self.total_stats["耗时统计"]
+            timing["检测次数"] = timing.get("检测次数", 0) + 1
+            timing["备用浏览器次数"] = timing.get("备用浏览器次数", 0) + int(bool(ip_info.get("备用浏览器")))
+            for field in ("浏览器启动耗时", "启动等待耗时", "检测耗时"):
+                timing[f"{field}总和"] = round(timing.get(f"{field}总和", 0) + ip_info.get(field, 0), 2)
+        
         # IP类型统计
         ip_type = ip_info.get("IP类型", "未知")
         self.total_stats["IP类型统计"][ip_type] = self.total_stats["IP类型统计"].get(ip_type, 0) + 1
@@ -91,44 +345,189 @@ class IPPoolQualityAnalyzer:
         native_ip = ip_info.get("原生IP", "未知")
         self.total_stats["原生IP统计"][native_ip] = self.total_stats["原生IP统计"].get(native_ip, 0) + 1
         
-        # 计算平均风控值
-        risk_value = ip_info.get("风控值", "0%")
-        try:
-            risk_num = float(risk_value.replace("%", ""))
-            current_avg = self.total_stats.get("平均风控值", 0)
-            success_count = self.total_stats["成功检测次数"]
-            new_avg = ((current_avg * (success_count - 1)) + risk_num) / success_count
-            self.total_stats["平均风控值"] = round(new_avg, 2)
-        except:
-            pass
+        # 计算平均风控值（保存总和与计数，多份统计可以精确合并）
+        risk_num = parse_risk_value(ip_info.get("风控值"))
+        if risk_num is not None:
+            self.total_stats["风控值总和"] += risk_num
+            self.total_stats["风控值计数"] += 1
+            self.total_stats["平均风控值"] = round(self.total_stats["风控值总和"] / self.total_stats["风控值计数"], 2)
+    
+    def timing_summary(self):
+        """平均浏览器启动耗时、等待浏览器就绪耗时和检测耗时（秒）"""
+        timing = self.total_stats["耗时统计"]
+        count = timing.get("检测次数", 0)
+        summary = {"检测次数": count, "备用浏览器次数": timing.get("备用浏览器次数", 0)}
+        for field in ("浏览器启动耗时", "启动等待耗时", "检测耗时"):
+            summary[f"平均{field}"] = round(timing.get(f"{field}总和", 0) / count, 2) if count else 0
+        return summary
+    
+    def rotation_estimator(self, proxy_url):
+        """代理的轮换周期估计，直接读写 total_stats["轮换估计"] 中该代理的项"""
+        data = self.total_stats["轮换估计"].setdefault(proxy_url, new_rotation_state())
+        return RotationEstimator(data)
+    
+    def observe_rotation(self, proxy_url, ip_info):
+        """记录代理本次检测的出口IP，用于学习轮换周期"""
+        if not ip_info or not ip_info.get("IP地址"):
+            return
+        with self._lock:
+            self.rotation_estimator(proxy_url).observe(ip_info["IP地址"], time.time())
     
-    def save_data(self, ip_info):
-        """保存单次检测数据"""
-        self.total_stats["总检测次数"] += 1
-        self.current_count += 1
+    def next_check_delay(self, proxy_url):
+        """下一次检测前的等待秒数，返回 (秒数, 说明)
         
-        if ip_info:
-            self.total_stats["检测结果"].append(ip_info)
-            self.update_statistics(ip_info)
+        已学习到轮换周期时等到预计轮换之后再检测；样本不足、多代理轮流检测
+        或关闭了轮换感知调度时使用固定检测间隔
+        """
+        if not self.rotation_aware or len(self.proxy_urls) > 1:
+            return self.delay_between_checks, None
+        # 观测时间是检测完成时刻，提前一个典型检测耗时开始，使连接建立在轮换之后
+        lead = self.durations.percentile(50) or 0
+        with self._lock:
+            estimator = self.rotation_estimator(proxy_url)
+            delay = estimator.next_check_delay(time.time(), lead)
+            period = estimator.period()
+        if delay is None:
+            return self.delay_between_checks, None
+        if period is None:
+            return delay, "代理每次连接轮换IP"
+        return delay, f"轮换周期约 {period:.0f} 秒"
+    
+    def rotation_summary(self):
+        """各代理的轮换方式、周期，以及每次成功检测得到的独立IP数"""
+        summary = {proxy: RotationEstimator(data).describe()
+                   for proxy, data in self.total_stats["轮换估计"].items() if data["检测次数"]}
+        success = self.total_stats["成功检测次数"]
+        unique_ips = self.sketches.estimates()["独立IP数"]
+        return {
+            "代理": summary,
+            "独立IP/检测": round(min(unique_ips, success) / success, 3) if success else 0,
+        }
+    
+    def get_snapshot(self):
+        """获取当前统计快照（不包含完整检测结果列表）"""
+        with self._lock:
+            snapshot = {key: value for key, value in self.total_stats.items() if key != "检测结果"}
+            results = self.total_stats["检测结果"]
+            snapshot["检测结果数量"] = len(results)
+            snapshot["最近检测结果"] = self.last_result
+            snapshot["当前进度"] = f"{self.current_count}/{self.max_checks}"
+            # 原始分桶和概率统计数据较大，快照中只提供汇总结果
+            del snapshot["时间窗口统计"]
+            snapshot.pop("概率统计", None)
+            snapshot["滚动窗口"] = self.rolling.summaries()
+            snapshot["去重估计"] = self.sketches.estimates()
+            snapshot["浏览器资源统计"] = describe_resource_stats(self.total_stats["浏览器资源统计"])
+            snapshot["耗时统计"] = self.timing_summary()
+            snapshot["检测耗时分布"] = self.durations.summary()
+            snapshot["代理排名"] = ProxyBandit.ranking(self.total_stats["代理评估"])
+            snapshot["轮换估计"] = self.rotation_summary()
+            if self.spare_pool:
+                snapshot["备用浏览器池"] = dict(self.spare_pool.stats)
+            snapshot["写入统计"] = dict(self.writer.stats)
+            return snapshot
+    
+    def publish_snapshot(self, force=False):
+        """向实时统计服务发布最新快照（高频更新时限制发布频率）"""
+        if not self.live_stats_server or not self.live_stats_server.running:
+            return
+        now = time.time()
+        if not force and now - self._last_publish < LIVE_STATS_CONFIG.get("min_interval", 0.5):
+            return
+        self._last_publish = now
+        # 持锁序列化，快照中的嵌套字典与检测循环共享，不能在序列化过程中被修改
+        with self._lock:
+            self.live_stats_server.publish(self.get_snapshot())
+    
+    def save_data(self, ip_info, failure=None, persist=True, proxy_url=None):
+        """保存单次检测数据（persist=False 时只更新内存中的统计，由调用方统一写文件）"""
+        with self._lock:
+            self.total_stats["总检测次数"] += 1
+            self.current_count += 1
+            
+            if ip_info:
+                stored = self.result_encoder.encode(ip_info) if self.result_encoder else ip_info
+                self.total_stats["检测结果"].append(stored)
+                self.last_result = ip_info
+            self.update_statistics(ip_info, failure)
+            
+            # 代理质量估计
+            if proxy_url:
+                self.bandit.record(proxy_url, ip_info)
+            
+            # 熔断器状态
+            self.total_stats["熔断器状态"] = {proxy: breaker.to_dict() for proxy, breaker in self.breakers.items()}
+            
+            # 更新检测时间
+            self.total_stats["最后检测时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # 更新检测时间
-        self.total_stats["最后检测时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.publish_snapshot()
         
-        # 保存到文件
+        if not persist:
+            return
+        if self.writer.running:
+            self.writer.submit()
+        else:
+            self.write_data_file()
+    
+    def sync_sketches(self):
+        """把概率统计序列化到统计字典中（只在写文件前执行）"""
+        with self._lock:
+            self.total_stats["概率统计"] = self.sketches.to_dict()
+            self.total_stats["去重估计"] = self.sketches.estimates()
+    
+    def state_snapshot(self):
+        """持锁复制当前统计数据，供锁外序列化
+        
+        检测结果列表只追加、已保存的记录不再修改，复制列表即可；概率统计每次同步时整体替换，
+        直接引用；其余统计项较小，深复制
+        """
+        with self._lock:
+            snapshot = {}
+            for key, value in self.total_stats.items():
+                if key == "检测结果":
+                    snapshot[key] = list(value)
+                elif key == "概率统计":
+                    snapshot[key] = value
+                else:
+                    snapshot[key] = copy.deepcopy(value)
+            return snapshot
+    
+    def serialize_state(self):
+        """序列化当前统计数据（只在复制快照时持锁，编码在锁外进行，不阻塞检测循环）
+        
+        数据文件扩展名为 .p0cb 时使用紧凑二进制格式，否则为JSON
+        """
+        self.sync_sketches()
+        state = self.state_snapshot()
+        if self.data_file.endswith(COMPACT_EXTENSION):
+            return encode_store(state)
+        return json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    def write_data_file(self):
+        """将当前统计数据同步写入数据文件"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.total_stats, f, ensure_ascii=False, indent=2)
+            atomic_write(self.data_file, self.serialize_state(), self.writer.fsync)
         except Exception as e:
             print(f"❌ 保存数据失败: {e}")
     
     def save_final_stats(self):
         """保存最终统计信息"""
         self.total_stats["检测结束时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.sync_sketches()
+        self.publish_snapshot(force=True)
+        
+        if self.live_stats_server:
+            self.live_stats_server.stop()
+        
+        # 后台写入线程退出前会做最后一次提交（已包含结束时间），
+        # 未启动写入线程时（如本地模式）在这里同步写入
+        if self.writer.running:
+            self.writer.stop()
+        else:
+            self.write_data_file()
         
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.total_stats, f, ensure_ascii=False, indent=2)
-            
             # 同时保存一份统计摘要
             summary_file = f"ip_pool_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             summary = {
@@ -140,7 +539,14 @@ class IPPoolQualityAnalyzer:
                     "IP类型分布": self.total_stats["IP类型统计"],
                     "风控等级分布": self.total_stats["风控等级统计"],
                     "国家分布": self.total_stats["国家分布统计"],
-                    "原生IP分布": self.total_stats["原生IP统计"]
+                    "原生IP分布": self.total_stats["原生IP统计"],
+                    "去重估计": self.total_stats["去重估计"],
+                    "浏览器资源": describe_resource_stats(self.total_stats["浏览器资源统计"]),
+                    "耗时统计": self.timing_summary(),
+                    "检测耗时分布": self.durations.summary(),
+                    "代理排名": ProxyBandit.ranking(self.total_stats["代理评估"]),
+                    "轮换估计": self.rotation_summary(),
+                    "滚动窗口": self.rolling.summaries()
                 }
             }
             
@@ -182,44 +588,159 @@ class IPPoolQualityAnalyzer:
                 percentage = count / self.total_stats["成功检测次数"] * 100
                 print(f"  {country}: {count} ({percentage:.1f}%)")
         
+        estimates = self.sketches.estimates()
+        print(f"\n🔢 去重估计: 独立IP约 {estimates['独立IP数']} 个, 独立ASN约 {estimates['独立ASN数']} 个, "
+              f"独立网段约 {estimates['独立网段数']} 个, 重复率 {estimates['重复率']}")
+        
+        print("\n🕒 滚动窗口:")
+        for name, window in self.rolling.summaries().items():
+            print(f"  {name}: 检测 {window['检测次数']} 次, 成功率 {window['成功率']}, "
+                  f"平均风控值 {window['平均风控值']}%, 原生IP占比 {window['原生IP占比']}, 新IP占比 {window['新IP占比']}")
+        
+        if self.total_stats["失败分类统计"]:
+            print(f"\n❌ 失败分类 (重试 {self.total_stats['重试次数']} 次):")
+            for failure, count in self.total_stats["失败分类统计"].items():
+                print(f"  {failure}: {count}")
+        
+        timing = self.timing_summary()
+        if timing["检测次数"]:
+            print(f"\n⏱️ 耗时: 浏览器启动平均 {timing['平均浏览器启动耗时']}秒, "
+                  f"等待浏览器就绪平均 {timing['平均启动等待耗时']}秒, 检测平均 {timing['平均检测耗时']}秒 "
+                  f"(使用备用浏览器 {timing['备用浏览器次数']}/{timing['检测次数']} 次)")
+        
+        durations = self.durations.summary()
+        if durations["检测次数"]:
+            print(f"⏱️ 单次检测总耗时: P50 {durations['P50']}秒, P95 {durations['P95']}秒, P99 {durations['P99']}秒, "
+                  f"最长 {durations['最大值']}秒 (时间预算 {self.check_timeout}秒)")
+        
+        resources = describe_resource_stats(self.total_stats["浏览器资源统计"])
+        # 未安装psutil时没有资源采样，回收和清理次数仍然显示
+        if resources["采样次数"] or resources["回收次数"] or resources["清理残留进程数"]:
+            print(f"\n🖥️ 浏览器资源: 平均内存 {resources['平均内存MB']}MB (峰值 {resources['峰值内存MB']}MB), "
+                  f"平均CPU {resources['平均CPU秒']}秒, 峰值子进程 {resources['峰值子进程数']} 个, "
+                  f"回收 {resources['回收次数']} 次, 清理残留进程 {resources['清理残留进程数']} 个")
+        
+        ranking = ProxyBandit.ranking(self.total_stats["代理评估"])
+        if len(ranking) > 1:
+            print("\n🏆 代理排名:")
+            for row in ranking:
+                print(f"  {row['排名']}. {row['代理']}: 质量得分 {row['质量得分']} ({row['置信区间']}), "
+                      f"检测 {row['检测次数']} 次, 成功率 {row['成功率']}, 平均风控值 {row['平均风控值']}%, "
+                      f"原生IP占比 {row['原生IP占比']}")
+        
+        rotation = self.rotation_summary()
+        if rotation["代理"]:
+            print(f"\n🔄 代理轮换 (每次成功检测得到独立IP {rotation['独立IP/检测']} 个):")
+            for proxy, row in rotation["代理"].items():
+                period = f", 周期约 {row['轮换周期(秒)']}秒" if row["轮换周期(秒)"] else ""
+                print(f"  {proxy}: {row['轮换方式']}{period}, 相邻检测IP变化率 {row['IP变化率']} "
+                      f"({row['IP变化次数']}/{max(row['检测次数'] - 1, 0)})")
+        
+        if self.breakers:
+            print("\n🚦 代理熔断器:")
+            for proxy, breaker in self.breakers.items():
+                print(f"  {proxy}: {breaker.state} (连续失败 {breaker.consecutive_failures}, 熔断 {breaker.open_count} 次)")
+        
         print("="*60)
     
+    def record_recycles(self, checker):
+        """把检查器因资源超限或复用次数已满回收浏览器的次数计入统计（归还到池之前调用）"""
+        if checker.recycle_count:
+            with self._lock:
+                self.total_stats["浏览器资源统计"]["回收次数"] += checker.recycle_count
+    
+    def reap_browsers(self, include_own=False):
+        """清理残留的浏览器进程并计入统计（未安装psutil时只清理临时配置目录）"""
+        killed = reap_orphan_browsers(include_own)
+        if killed:
+            print(f"🧹 已清理 {killed} 个残留浏览器进程")
+            with self._lock:
+                self.total_stats["浏览器资源统计"]["清理残留进程数"] += killed
+    
     def run(self):
         """运行主程序"""
         print("🚀 动态代理IP池质量统计工具")
         print("="*60)
         print(f"📁 数据文件: {self.data_file}")
         print(f"🎯 最大检测次数: {self.max_checks}")
-        print(f"⏰ 检测间隔: {self.delay_between_checks}秒")
-        print(f"🌐 代理设置: {self.proxy_url}")
-        print(f"🔗 检测模式: {'真实网站' if self.use_real_site else '本地HTML'}")
+        if self.rotation_aware and self.use_real_site and not self.batch_file:
+            print(f"⏰ 检测间隔: 按代理轮换周期调度 (周期未知时 {self.delay_between_checks}秒)")
+        else:
+            print(f"⏰ 检测间隔: {self.delay_between_checks}秒")
+        if len(self.proxy_urls) > 1:
+            print(f"🌐 代理设置: {len(self.proxy_urls)} 个代理，"
+                  f"{'轮流使用' if self.batch_file else '按质量估计自适应分配检测'}")
+        else:
+            print(f"🌐 代理设置: {self.proxy_url}")
+        if self.use_real_site:
+            print(f"🧊 备用浏览器: {self.spare_browsers} 个")
+        if self.batch_file:
+            print(f"🔗 检测模式: 批量IP查询 ({self.batch_file}, {self.batch_workers} 个浏览器并发)")
+        else:
+            print(f"🔗 检测模式: {'真实网站' if self.use_real_site else f'本地HTML ({self.html_source})'}")
         print("💡 按 Ctrl+C 可随时停止并保存数据")
         print("="*60)
         
+        # 启动实时统计服务
+        if self.live_stats_server:
+            self.live_stats_server.start()
+        
         # 加载现有数据
         self.load_existing_data()
         
+        # 清理上次异常退出残留的浏览器进程
+        if self.use_real_site:
+            self.reap_browsers()
+        
+        # 启动后台写入线程，检测循环只提交通知，不等待磁盘
+        self.writer.start()
+        
+        # 无论正常结束还是被信号中断，都在这里统一收尾保存
+        completed = False
+        try:
+            if self.batch_file:
+                self.run_batch()
+            elif self.use_real_site:
+                self.run_checks()
+            else:
+                self.run_local()
+            completed = True
+        finally:
+            # 被中断时正在检测的浏览器也要关闭，不留下残留进程
+            if self.active_checker:
+                self.active_checker.close()
+            if self.spare_pool:
+                self.spare_pool.close_all()
+            self._batch_stop.set()
+            if self.batch_pool:
+                self.batch_pool.close_all()
+            if self.use_real_site:
+                self.reap_browsers(include_own=True)
+            if completed:
+                self.print_current_stats()
+            self.save_final_stats()
+    
+    def run_checks(self):
+        """真实网站检测循环"""
         while self.current_count < self.max_checks:
+            proxy_url = self.next_proxy()
+            if proxy_url is None:
+                print("\n🏁 所有代理的质量估计都已达到置信目标，提前结束检测")
+                break
+            
             print(f"\n🔍 开始第 {self.current_count + 1} 次IP检测...")
+            if len(self.proxy_urls) > 1:
+                print(f"🌐 使用代理: {proxy_url}")
             
-            # 创建检查器实例
-            checker = AdvancedPing0CCChecker()
+            # 代理处于熔断状态时不调度检测，等待冷却结束后再探测
+            breaker = self.get_breaker(proxy_url)
+            wait_seconds = breaker.retry_after()
+            if wait_seconds > 0:
+                print(f"🚫 代理已熔断，{wait_seconds:.0f}秒后进行探测...")
+                time.sleep(wait_seconds)
             
             try:
-                # 执行检测 - 支持代理和多种模式，传递循环索引
-                if self.use_real_site:
-                    ip_info = checker.check_ip_advanced(
-                        proxy_url=self.proxy_url, 
-                        use_real_site=True,
-                        loop_index=self.current_count + 1
-                    )
-                else:
-                    ip_info = checker.check_ip_advanced(
-                        html_file="ping0.cc.html",
-                        proxy_url=self.proxy_url,
-                        use_real_site=False,
-                        loop_index=self.current_count + 1
-                    )
+                ip_info, failure = self.check_with_retry(proxy_url, self.current_count + 1)
                 
                 if ip_info:
                     print("✅ 检测成功")
@@ -229,10 +750,11 @@ class IPPoolQualityAnalyzer:
                     print(f"⚠️ 风控: {ip_info.get('风控值', '未知')} ({ip_info.get('风控等级', '未知')})")
                     print(f"🔗 ASN: {ip_info.get('ASN', '未知')}")
                 else:
-                    print("❌ 检测失败")
+                    print(f"❌ 检测失败 ({failure})")
                 
-                # 保存数据
-                self.save_data(ip_info)
+                # 保存数据（出口IP同时用于学习代理的轮换周期）
+                self.observe_rotation(proxy_url, ip_info)
+                self.save_data(ip_info, failure, proxy_url=proxy_url)
                 
                 # 每10次检测显示统计信息
                 if (self.current_count) % 10 == 0:
@@ -240,38 +762,191 @@ class IPPoolQualityAnalyzer:
                 
             except Exception as e:
                 print(f"❌ 检测过程出错: {e}")
-                self.save_data(None)
+                self.save_data(None, proxy_url=proxy_url)
             
-            # 如果还没达到最大次数，等待后继续
+            # 如果还没达到最大次数，等待后继续（已学习到轮换周期时等到预计轮换之后）
             if self.current_count < self.max_checks:
-                print(f"⏳ 等待 {self.delay_between_checks} 秒后进行下一次检测...")
-                time.sleep(self.delay_between_checks)
+                delay, reason = self.next_check_delay(proxy_url)
+                if reason:
+                    print(f"⏳ {reason}，等待 {delay:.1f} 秒后进行下一次检测...")
+                else:
+                    print(f"⏳ 等待 {delay} 秒后进行下一次检测...")
+                time.sleep(delay)
         
         # 完成所有检测
-        print(f"\n🎉 已完成 {self.max_checks} 次检测!")
-        self.print_current_stats()
-        self.save_final_stats()
+        print(f"\n🎉 已完成 {self.current_count} 次检测!")
+
+    def lookup_ip(self, pool, proxy_url, ip, loop_index):
+        """批量模式下查询一个IP的 /ip/<地址> 页面，返回 (检测结果, 失败分类)"""
+        breaker = self.get_breaker(proxy_url)
+        wait_seconds = breaker.retry_after()
+        if wait_seconds > 0:
+            self._batch_stop.wait(wait_seconds)
+        with self._lock:
+            if not breaker.allow():
+                return None, FAILURE_CIRCUIT_OPEN
+        
+        start = time.time()
+        checker, ip_info, error = None, None, None
+        wait_seconds, reused = 0, False
+        try:
+            # 每个工作线程复用池中同代理的浏览器，省去每次查询的启动和建连开销
+            checker, wait_seconds, reused = pool.acquire(proxy_url, self.check_timeout)
+            ip_info = checker.check_ip_advanced(
+                proxy_url=proxy_url,
+                use_real_site=True,
+                loop_index=loop_index,
+                keep_driver=True,
+                timeout=max(self.check_timeout - (time.time() - start), 0.1),
+                target_ip=ip
+            )
+        except Exception as e:
+            error = e
+        finally:
+            if checker:
+                self.record_recycles(checker)
+                pool.release(checker, reuse=ip_info is not None)
+        
+        failure = classify_failure(error or (checker and checker.last_error), ip_info,
+                                   checker.challenge_cleared if checker else True)
+        if failure is None and ip_info.get("IP地址") != ip:
+            # 页面显示的不是查询的IP（如被重定向到首页）
+            failure = FAILURE_PARSE_MISS
+        
+        with self._lock:
+            self.durations.add(round(time.time() - start, 2))
+            if failure is None:
+                breaker.record_success()
+            elif failure != FAILURE_PARSE_MISS:
+                # 解析缺失与具体IP有关，不计入代理的熔断
+                breaker.record_failure(failure)
+        
+        if failure is not None:
+            return None, failure
+        ip_info["查询IP"] = ip
+        ip_info["代理"] = proxy_url
+        ip_info["浏览器启动耗时"] = 0 if reused else round(checker.launch_seconds, 2)
+        ip_info["启动等待耗时"] = round(wait_seconds, 2)
+        ip_info["检测耗时"] = round(time.time() - start - wait_seconds, 2)
+        ip_info["备用浏览器"] = reused
+        return ip_info, None
+    
+    def run_batch(self):
+        """批量查询IP列表 - 有限并发、复用浏览器，跳过已有结果和检查点中已处理的IP"""
+        from batch_lookup import read_ip_list, checkpoint_path, BatchCheckpoint
+        from checker_pool import CheckerPool
+        
+        ips, invalid = read_ip_list(self.batch_file)
+        checkpoint = BatchCheckpoint(checkpoint_path(self.batch_file))
+        known = {result.get("IP地址") for result in self.total_stats["检测结果"]}
+        pending = [ip for ip in ips if ip not in known and ip not in checkpoint]
+        
+        print(f"📋 IP列表共 {len(ips)} 个IP (无效行 {invalid} 个)，已有结果 {len(set(ips) & known)} 个，"
+              f"检查点中已处理 {len(checkpoint)} 个，待查询 {len(pending)} 个")
+        if not pending:
+            checkpoint.remove()
+            return
+        
+        self.max_checks = self.current_count + len(pending)
+        work = queue.Queue()
+        for index, ip in enumerate(pending):
+            work.put((index, ip))
+        
+        self.batch_pool = CheckerPool(max_idle_per_proxy=self.batch_workers)
+        failed = []
+        
+        def worker():
+            while not self._batch_stop.is_set():
+                try:
+                    index, ip = work.get_nowait()
+                except queue.Empty:
+                    return
+                # 多个代理时轮流使用
+                proxy_url = self.proxy_urls[index % len(self.proxy_urls)]
+                try:
+                    ip_info, failure = self.lookup_ip(self.batch_pool, proxy_url, ip, self.current_count + 1)
+                except Exception as e:
+                    print(f"❌ 查询 {ip} 过程出错: {e}")
+                    ip_info, failure = None, None
+                if self._batch_stop.is_set():
+                    # 中断时正在进行的查询不记录，恢复后重新查询
+                    return
+                
+                if ip_info:
+                    print(f"✅ {ip}: 风控值 {ip_info.get('风控值', '未知')}, {ip_info.get('IP类型', '未知')}")
+                else:
+                    print(f"❌ {ip}: {failure}")
+                # 查询的是指定IP而不是代理的出口IP，结果不计入代理质量估计
+                self.save_data(ip_info, failure)
+                # 只有查询成功的IP写入检查点，失败的IP再次运行时重新查询
+                with self._lock:
+                    if ip_info:
+                        checkpoint.mark(ip)
+                    else:
+                        failed.append(ip)
+        
+        threads = [threading.Thread(target=worker, name=f"batch-worker-{i + 1}", daemon=True)
+                   for i in range(min(self.batch_workers, len(pending)))]
+        for thread in threads:
+            thread.start()
+        try:
+            # 带超时的join，主线程仍能及时响应中断信号
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        finally:
+            self._batch_stop.set()
+            checkpoint.close()
+        
+        if not work.empty() or not all(ip in checkpoint or ip in failed for ip in pending):
+            return
+        if failed:
+            print(f"\n⚠️ 批量查询结束，成功 {len(pending) - len(failed)} 个，失败 {len(failed)} 个，"
+                  f"再次运行同一命令会重新查询失败的IP")
+            return
+        checkpoint.remove()
+        print(f"\n🎉 批量查询完成，共查询 {len(pending)} 个IP")
+    
+    def run_local(self):
+        """本地HTML模式 - 不启动浏览器，直接并行解析已保存的页面"""
+        from page_parser import find_html_files, parse_saved_pages
+        
+        paths = find_html_files(self.html_source)
+        if not paths:
+            print(f"❌ 未找到HTML文件: {self.html_source}")
+            return
+        
+        print(f"📂 找到 {len(paths)} 个HTML文件，开始解析...")
+        start_time = time.time()
+        
+        for i, (path, ip_info, error) in enumerate(parse_saved_pages(paths, self.parse_workers, self.current_count + 1), 1):
+            failure = classify_failure(error, ip_info)
+            if failure:
+                print(f"⚠️ {path}: {failure}")
+            
+            # 批量解析可随时重跑，逐条只更新内存统计，结束时统一写文件
+            self.save_data(ip_info if failure is None else None, failure, persist=False)
+            
+            if i % 1000 == 0:
+                print(f"⏳ 已解析 {i}/{len(paths)} 个页面...")
+        
+        elapsed = time.time() - start_time
+        print(f"\n🎉 已解析 {len(paths)} 个页面，耗时 {elapsed:.2f}秒 ({len(paths) / max(elapsed, 1e-6):.0f} 页/秒)")
 
-def generate_final_table():
+def generate_final_table(data_file='ip_pool_quality.json'):
     """生成最终表格报告"""
     try:
         print("\n🔄 正在生成表格报告...")
         
-        # 导入表格生成模块
-        import json
-        import csv
-        from datetime import datetime
-        
-        # 加载数据
+        # 加载数据（自动识别JSON或紧凑格式）
         try:
-            with open('ip_pool_quality.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_store(data_file)
         except:
             print("❌ 无法读取检测数据文件")
             return
         
         # 过滤有效结果
-        results = data.get('检测结果', [])
+        results = expand_results(data.get('检测结果', []))
         valid_results = [result for result in results if 'IP地址' in result and result.get('IP地址')]
         
         if not valid_results:
@@ -322,15 +997,15 @@ def generate_final_table():
     except Exception as e:
         print(f"❌ 生成表格报告失败: {e}")
 
-def main():
-    """主函数"""
+def interactive_menu():
+    """交互式菜单"""
     print("🚀 动态代理IP池质量统计工具")
     print("="*60)
     print("请选择运行模式:")
     print("1. 快速测试 (5次检测, 间隔5秒, 真实网站)")
     print("2. 标准检测 (50次检测, 间隔5秒, 真实网站)") 
     print("3. 深度分析 (100次检测, 间隔5秒, 真实网站)")
-    print("4. 本地测试 (使用ping0.cc.html文件)")
+    print("4. 本地测试 (解析已保存的HTML页面，不启动浏览器)")
     print("5. 自定义设置")
     
     try:
@@ -344,17 +1019,24 @@ def main():
         elif choice == "3":
             analyzer = IPPoolQualityAnalyzer(max_checks=100, delay_between_checks=delay_between_checks, use_real_site=True)
         elif choice == "4":
-            analyzer = IPPoolQualityAnalyzer(max_checks=5, delay_between_checks=delay_between_checks, use_real_site=False)
+            source = input("请输入HTML文件、目录或通配符 (默认: ping0.cc.html): ").strip() or "ping0.cc.html"
+            analyzer = IPPoolQualityAnalyzer(use_real_site=False, html_source=source)
         elif choice == "5":
             max_checks = int(input("请输入最大检测次数: ").strip())
             delay = int(input("请输入检测间隔(秒): ").strip())
-            proxy = input("请输入代理URL (默认: http://127.0.0.1:7890): ").strip() or "http://127.0.0.1:7890"
+            proxy = input("请输入代理URL，多个代理用逗号分隔 (默认: http://127.0.0.1:7890): ").strip() or "http://127.0.0.1:7890"
+            proxies = [item.strip() for item in proxy.split(",") if item.strip()]
             use_real = input("使用真实网站? (y/n, 默认y): ").strip().lower() != 'n'
+            source = "ping0.cc.html"
+            if not use_real:
+                source = input("请输入HTML文件、目录或通配符 (默认: ping0.cc.html): ").strip() or source
             analyzer = IPPoolQualityAnalyzer(
                 max_checks=max_checks, 
                 delay_between_checks=delay,
-                proxy_url=proxy,
-                use_real_site=use_real
+                proxy_url=proxies[0],
+                proxy_urls=proxies,
+                use_real_site=use_real,
+                html_source=source
             )
         else:
             print("无效选择，使用默认设置 (50次检测, 间隔5秒, 真实网站)")
@@ -378,5 +1060,130 @@ def main():
     except Exception as e:
         print(f"❌ 程序运行出错: {e}")
 
+def parse_args(argv):
+    """解析命令行参数，不带子命令时进入交互式菜单"""
+    parser = argparse.ArgumentParser(description="动态代理IP池质量统计工具")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    run_parser = subparsers.add_parser("run", help="非交互运行检测，已有数据文件时从上次的进度继续")
+    run_parser.add_argument("--data-file", default="ip_pool_quality.json", help="数据文件")
+    run_parser.add_argument("--max-checks", type=int, default=50, help="最大检测次数（包含已有记录）")
+    run_parser.add_argument("--delay", type=int, default=2, help="检测间隔(秒)，学习到代理轮换周期之前使用")
+    run_parser.add_argument("--fixed-delay", action="store_true",
+                            help="始终使用固定检测间隔，不按学习到的代理轮换周期安排检测")
+    run_parser.add_argument("--proxy", nargs="+", default=["http://127.0.0.1:7890"],
+                            help="代理URL，指定多个时按质量估计自适应分配检测并输出代理排名")
+    run_parser.add_argument("--spares", type=int, default=None,
+                            help=f"预启动的备用浏览器数量，0为不预启动 (默认: {PREWARM_CONFIG['spare_browsers']})")
+    run_parser.add_argument("--timeout", type=float, default=None,
+                            help=f"单次检测的总时间预算(秒)，超时后强制结束浏览器 (默认: {DEADLINE_CONFIG['check_seconds']})")
+    run_parser.add_argument("--no-report", action="store_true", help="结束后不生成CSV报告")
+    
+    local_parser = subparsers.add_parser("local", help="本地模式：并行解析已保存的HTML页面（不启动浏览器）")
+    local_parser.add_argument("source", help="HTML文件、目录或通配符（如 'pages/**/*.html'）")
+    local_parser.add_argument("--data-file", default="ip_pool_quality.json", help="数据文件")
+    local_parser.add_argument("--workers", type=int, help="并行解析进程数（默认CPU核数）")
+    
+    batch_parser = subparsers.add_parser("batch", help="批量查询IP列表文件中的IP（/ip/<地址> 页面），中断后再次运行从中断处继续")
+    batch_parser.add_argument("ip_file", help="IP列表文件，每行一个IP")
+    batch_parser.add_argument("--data-file", default="ip_pool_quality.json", help="数据文件（已有结果的IP会跳过）")
+    batch_parser.add_argument("--workers", type=int, default=None,
+                              help=f"同时查询的浏览器数量 (默认: {BATCH_CONFIG['workers']})")
+    batch_parser.add_argument("--proxy", nargs="+", default=["http://127.0.0.1:7890"], help="代理URL，多个时轮流使用")
+    batch_parser.add_argument("--timeout", type=float, default=None,
+                              help=f"单个IP查询的总时间预算(秒) (默认: {DEADLINE_CONFIG['check_seconds']})")
+    batch_parser.add_argument("--no-report", action="store_true", help="结束后不生成CSV报告")
+    
+    stats_parser = subparsers.add_parser("stats", help="显示数据文件中的统计信息（不启动浏览器）")
+    stats_parser.add_argument("--data-file", default="ip_pool_quality.json", help="数据文件")
+    
+    export_parser = subparsers.add_parser("export", help="将数据文件导出为CSV报告（不启动浏览器）")
+    export_parser.add_argument("--data-file", default="ip_pool_quality.json", help="数据文件")
+    
+    merge_parser = subparsers.add_parser("merge", help="合并多台主机的统计数据文件")
+    merge_parser.add_argument("files", nargs="+", help="要合并的统计数据文件")
+    merge_parser.add_argument("-o", "--output", default="ip_pool_quality_merged.json", help="合并结果文件")
+    merge_parser.add_argument("--workers", type=int, help="并行读取的进程数（默认CPU核数）")
+    
+    convert_parser = subparsers.add_parser("convert", help="在JSON和紧凑二进制格式(.p0cb)之间转换数据文件")
+    convert_parser.add_argument("source", help="源文件（JSON或.p0cb）")
+    convert_parser.add_argument("target", help="目标文件，扩展名为.p0cb时转换为紧凑格式，否则转换为JSON")
+    convert_parser.add_argument("--compression", choices=["gzip", "zstd", "none"], default="gzip", help="紧凑格式的压缩方式")
+    
+    serve_parser = subparsers.add_parser("serve", help="服务模式：常驻运行，通过本地HTTP接口接收检测任务")
+    serve_parser.add_argument("--host", help="监听地址")
+    serve_parser.add_argument("--port", type=int, help="监听端口")
+    serve_parser.add_argument("--workers", type=int, help="并发检测数")
+    
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command == "serve":
+        from check_service import serve
+        serve(args.host, args.port, args.workers)
+    elif args.command == "run":
+        analyzer = IPPoolQualityAnalyzer(
+            data_file=args.data_file,
+            max_checks=args.max_checks,
+            delay_between_checks=args.delay,
+            proxy_url=args.proxy[0],
+            proxy_urls=args.proxy,
+            use_real_site=True,
+            spare_browsers=args.spares,
+            check_timeout=args.timeout,
+            rotation_aware=False if args.fixed_delay else None
+        )
+        try:
+            analyzer.run()
+        except KeyboardInterrupt:
+            print("\n👋 检测已中断，数据已保存")
+        if not args.no_report:
+            generate_final_table(args.data_file)
+    elif args.command == "batch":
+        analyzer = IPPoolQualityAnalyzer(
+            data_file=args.data_file,
+            proxy_url=args.proxy[0],
+            proxy_urls=args.proxy,
+            use_real_site=True,
+            spare_browsers=0,
+            check_timeout=args.timeout,
+            batch_file=args.ip_file,
+            batch_workers=args.workers
+        )
+        try:
+            analyzer.run()
+        except KeyboardInterrupt:
+            print("\n👋 批量查询已中断，数据已保存，再次运行同一命令可继续")
+        if not args.no_report:
+            generate_final_table(args.data_file)
+    elif args.command == "local":
+        analyzer = IPPoolQualityAnalyzer(
+            data_file=args.data_file,
+            use_real_site=False,
+            html_source=args.source,
+            parse_workers=args.workers
+        )
+        try:
+            analyzer.run()
+        except KeyboardInterrupt:
+            print("\n👋 解析已中断，数据已保存")
+    elif args.command == "merge":
+        from merge_stats import merge_command
+        merge_command(args.files, args.output, args.workers)
+    elif args.command == "convert":
+        from compact_storage import convert
+        convert(args.source, args.target, args.compression)
+    elif args.command == "stats":
+        analyzer = IPPoolQualityAnalyzer(data_file=args.data_file)
+        analyzer.load_existing_data()
+        analyzer.print_current_stats()
+    elif args.command == "export":
+        generate_final_table(args.data_file)
+    else:
+        interactive_menu()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
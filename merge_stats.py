@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多主机统计合并 - 把多份 ip_pool_quality.json 合并为一份全局统计
+
+统计数据只保存可精确合并的量：计数、风控值总和/计数、时间分桶和概率统计，
+平均值等派生指标在合并后重新计算
+"""
+
+import json
+import os
+from datetime import datetime
+from rolling_stats import parse_risk_value, merge_bucket
+from sketches import PoolSketches, ReservoirSample
+from compact_storage import load_store, save_store
+from resource_monitor import new_resource_stats, merge_resource_stats
+from delta_store import expand_results, encode_results
+from config import PERSISTENCE_CONFIG
+
+# 直接相加的计数项
+COUNT_FIELDS = ["总检测次数", "成功检测次数", "失败检测次数", "重试次数", "风控值总和", "风控值计数"]
+
+# 按键相加的分布统计项
+COUNTER_FIELDS = ["IP类型统计", "风控等级统计", "国家分布统计", "ASN分布统计", "原生IP统计", "失败分类统计", "耗时统计"]
+
+# 按 "主机 代理" 区分、合并时直接复制的按代理状态项
+HOST_KEYED_FIELDS = ["熔断器状态", "轮换估计"]
+
+
+def ensure_mergeable(stats, source_name=None):
+    """补齐旧版本统计中缺少的可合并字段（就地修改并返回）"""
+    if "风控值计数" not in stats:
+        # 旧版本只保存了四舍五入后的平均值，从检测结果中重新计算精确的总和与计数
+        values = [parse_risk_value(result.get("风控值")) for result in expand_results(stats.get("检测结果", []))]
+        values = [value for value in values if value is not None]
+        stats["风控值总和"] = sum(values)
+        stats["风控值计数"] = len(values)
+
+    if "概率统计" not in stats:
+        # 旧版本没有概率统计，按检测结果重新观测，独立IP数和重复率才能与其他文件合并
+        sketches = PoolSketches()
+        for result in expand_results(stats.get("检测结果", [])):
+            sketches.observe(result)
+        stats["概率统计"] = sketches.to_dict()
+        stats["去重估计"] = sketches.estimates()
+
+    if source_name and not stats.get("主机"):
+        stats["主机"] = source_name
+    return stats
+
+
+def prefix_host_keys(stats):
+    """把单台主机统计中的按代理状态项改为以 "主机 代理" 为键（就地修改并返回）
+
+    只在读取原始文件时执行一次；合并结果的主机为列表，键已带主机前缀，不再处理
+    """
+    host = stats.get("主机")
+    if not isinstance(host, str):
+        return stats
+    for field in HOST_KEYED_FIELDS:
+        stats[field] = {f"{host} {proxy}": state for proxy, state in stats.get(field, {}).items()}
+    return stats
+
+
+def load_stats_file(path):
+    """读取一份统计数据文件（JSON或紧凑格式）"""
+    stats = load_store(path)
+    if not isinstance(stats, dict) or "检测结果" not in stats:
+        raise ValueError(f"{path} 不是IP池统计数据文件")
+    return prefix_host_keys(ensure_mergeable(stats, os.path.splitext(os.path.basename(path))[0]))
+
+
+def merge_stats(stats_list):
+    """合并多份统计数据，返回新的统计字典"""
+    merged = {
+        "主机": [],
+        "检测结果": [],
+        "时间窗口统计": {"分钟": {}, "小时": {}},
+        "熔断器状态": {},
+        "浏览器资源统计": new_resource_stats(),
+        "代理评估": {},
+        "检测耗时分布": {},
+        "轮换估计": {},
+    }
+    for field in COUNT_FIELDS:
+        merged[field] = 0
+    for field in COUNTER_FIELDS:
+        merged[field] = {}
+
+    sketches = None
+    durations = ReservoirSample(merged["检测耗时分布"])
+    start_times, end_times = [], []
+
+    for stats in stats_list:
+        hosts = stats.get("主机") or []
+        hosts = hosts if isinstance(hosts, list) else [hosts]
+        merged["主机"].extend(host for host in hosts if host not in merged["主机"])
+
+        for field in COUNT_FIELDS:
+            merged[field] += stats.get(field, 0)
+
+        for field in COUNTER_FIELDS:
+            counter = merged[field]
+            for key, count in stats.get(field, {}).items():
+                counter[key] = counter.get(key, 0) + count
+
+        # 时间桶按桶起始时间对齐相加
+        for level, buckets in stats.get("时间窗口统计", {}).items():
+            target = merged["时间窗口统计"].setdefault(level, {})
+            for key, bucket in buckets.items():
+                merge_bucket(target.setdefault(key, {}), bucket)
+
+        merge_resource_stats(merged["浏览器资源统计"], stats.get("浏览器资源统计", {}))
+        durations.merge(ReservoirSample(dict(stats.get("检测耗时分布", {}))))
+
+        # 各代理的质量估计按代理相加
+        for proxy, arm in stats.get("代理评估", {}).items():
+            merge_bucket(merged["代理评估"].setdefault(proxy, {}), arm)
+
+        if stats.get("概率统计"):
+            partial = PoolSketches(stats["概率统计"])
+            sketches = partial if sketches is None else sketches.merge(partial)
+
+        # 熔断器状态和轮换估计（各主机自己的观测时间线，不能交错合并）读取文件时已改为以 "主机 代理" 为键，
+        # 合并部分结果时原样复制
+        for field in HOST_KEYED_FIELDS:
+            merged[field].update(stats.get(field, {}))
+
+        # 检测结果标注来源主机，合并后的报告可以区分
+        for result in expand_results(stats.get("检测结果", [])):
+            if len(hosts) == 1 and "主机" not in result:
+                result = dict(result, 主机=hosts[0])
+            merged["检测结果"].append(result)
+
+        if stats.get("检测开始时间"):
+            start_times.append(stats["检测开始时间"])
+        for field in ("检测结束时间", "最后检测时间"):
+            if stats.get(field):
+                end_times.append(stats[field])
+
+    # 重新计算派生指标
+    merged["平均风控值"] = round(merged["风控值总和"] / merged["风控值计数"], 2) if merged["风控值计数"] else 0
+    merged["检测结果"].sort(key=lambda result: result.get("检测时间", ""))
+    if PERSISTENCE_CONFIG.get("delta_results", True):
+        # 按时间排序后重新做增量编码
+        merged["检测结果"] = encode_results(merged["检测结果"])
+    for level, buckets in merged["时间窗口统计"].items():
+        merged["时间窗口统计"][level] = {key: buckets[key] for key in sorted(buckets, key=int)}
+    if start_times:
+        merged["检测开始时间"] = min(start_times)
+    if end_times:
+        merged["最后检测时间"] = max(end_times)
+    if sketches is not None:
+        merged["概率统计"] = sketches.to_dict()
+        merged["去重估计"] = sketches.estimates()
+    merged["合并时间"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    merged["合并来源数"] = len(stats_list)
+    return merged
+
+
+def _load_and_merge(paths):
+    """在子进程中读取并合并一组文件"""
+    return merge_stats([load_stats_file(path) for path in paths])
+
+
+def merge_files(paths, workers=None):
+    """并行读取并合并多份统计文件
+
+    文件按进程数分组，每个子进程读取并合并自己的一组，主进程再合并各组的部分结果
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    if workers == 1:
+        return _load_and_merge(paths)
+
+    groups = [paths[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partials = list(executor.map(_load_and_merge, groups))
+
+    merged = merge_stats(partials)
+    merged["合并来源数"] = len(paths)
+    return merged
+
+
+def merge_command(paths, output_file, workers=None):
+    """合并命令：合并多份统计并写入输出文件"""
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        print(f"❌ 文件不存在: {', '.join(missing)}")
+        return None
+
+    print(f"🔄 正在合并 {len(paths)} 份统计数据...")
+    try:
+        merged = merge_files(paths, workers)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"❌ 合并失败: {e}")
+        return None
+
+    save_store(output_file, merged)
+
+    success_rate = merged["成功检测次数"] / max(merged["总检测次数"], 1) * 100
+    print(f"✅ 合并结果已保存到: {output_file}")
+    print(f"🖥️ 主机: {', '.join(str(host) for host in merged['主机'])}")
+    print(f"📊 总检测次数: {merged['总检测次数']}, 成功率: {success_rate:.1f}%, 平均风控值: {merged['平均风控值']}%")
+    if merged.get("去重估计"):
+        print(f"🔢 独立IP约 {merged['去重估计']['独立IP数']} 个, 重复率 {merged['去重估计']['重复率']}")
+    return merged
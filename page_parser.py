@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ping0.cc 页面解析器 - 不依赖浏览器，直接从HTML源码中提取IP信息
+浏览器模式的源码回退解析和本地HTML模式共用同一套提取规则
+"""
+
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# 从JavaScript变量中提取信息（最准确的方法）
+# 所有变量合并为一个正则，整页只扫描一遍，每个变量取第一次出现的值
+JS_VARIABLE_FIELDS = {
+    "ip": "IP地址",
+    "ipnum": "IP地址(数字)",
+    "longitude": "经度",
+    "latitude": "纬度",
+    "loc": "IP位置",
+    "asndomain": "ASN域名",
+    "orgdomain": "企业域名",
+}
+JS_VARIABLE_PATTERN = re.compile(
+    r"window\.(ip|ipnum|longitude|latitude|asndomain|orgdomain)\s*=\s*['\"]([^'\"]+)['\"]"
+    r"|window\.(loc)\s*=\s*`([^`]+)`"
+)
+
+TITLE_PATTERN = re.compile(r"<title>\s*(.*?)\s*</title>", re.DOTALL)
+ASN_PATTERN = re.compile(r'<a href="[^"]*\/as\/AS(\d+)"[^>]*>AS(\d+)<\/a>')
+ASN_OWNER_PATTERN = re.compile(r'<div class="name">\s*ASN 所有者\s*</div>\s*<div class="content">\s*(?:<span[^>]*>[^<]*</span>\s*)?([^<\n]+?)(?:\s*<span|</div>)', re.DOTALL)
+ORG_PATTERN = re.compile(r'<div class="name">\s*企业\s*</div>\s*<div class="content">\s*(?:<span[^>]*>[^<]*</span>\s*)?([^<\n]+?)(?:\s*<span|</div>)', re.DOTALL)
+IPTYPE_PATTERN = re.compile(r'<span class="label[^"]*">([^<]+)</span>')
+RISK_PATTERN = re.compile(r'<span class="value">(\d+%)</span><span class="lab">\s*([^<]+)</span>')
+NATIVE_IP_PATTERN = re.compile(r'<div class="name">\s*<span>原生 IP</span>.*?</div>\s*<div class="content">\s*<span class="label[^"]*"[^>]*>([^<]+)</span>', re.DOTALL)
+FLAG_PATTERN = re.compile(r'<img src="/static/images/flags/([^"]+)\.png"[^>]*>([^<]+)')
+IPV4_PATTERN = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+
+# 判断提取是否完整的关键字段
+KEY_FIELDS = ["IP地址", "IP位置", "ASN"]
+
+# 本地模式支持的页面文件扩展名
+HTML_EXTENSIONS = (".html", ".htm")
+
+
+def parse_ip_info_from_html(page_source, loop_index=1, page_title=None, page_url=None):
+    """从页面源码中提取IP信息"""
+    if page_title is None:
+        title_match = TITLE_PATTERN.search(page_source)
+        page_title = title_match.group(1) if title_match else ""
+
+    ip_info = {
+        "循环索引": loop_index,
+        "检测时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "页面标题": page_title,
+        "页面URL": page_url or "",
+    }
+
+    for match in JS_VARIABLE_PATTERN.finditer(page_source):
+        name, value = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        ip_info.setdefault(JS_VARIABLE_FIELDS[name], value)
+
+    # 提取ASN信息
+    asn_match = ASN_PATTERN.search(page_source)
+    if asn_match:
+        ip_info["ASN"] = f"AS{asn_match.group(1)}"
+
+    # 提取ASN所有者
+    asn_owner_match = ASN_OWNER_PATTERN.search(page_source)
+    if asn_owner_match:
+        ip_info["ASN所有者"] = asn_owner_match.group(1).strip()
+
+    # 提取企业信息
+    org_match = ORG_PATTERN.search(page_source)
+    if org_match:
+        ip_info["企业"] = org_match.group(1).strip()
+
+    # 提取IP类型
+    for iptype in IPTYPE_PATTERN.findall(page_source):
+        if "IDC" in iptype or "家庭宽带" in iptype:
+            ip_info["IP类型"] = iptype.strip()
+            break
+
+    # 提取风控值
+    risk_match = RISK_PATTERN.search(page_source)
+    if risk_match:
+        ip_info["风控值"] = risk_match.group(1)
+        ip_info["风控等级"] = risk_match.group(2).strip()
+
+    # 提取原生IP信息
+    native_ip_match = NATIVE_IP_PATTERN.search(page_source)
+    if native_ip_match:
+        ip_info["原生IP"] = native_ip_match.group(1).strip()
+
+    # 提取国家旗帜信息（IP位置信息已经通过JS变量获取，这里不覆盖）
+    flag_match = FLAG_PATTERN.search(page_source)
+    if flag_match:
+        ip_info["国家代码"] = flag_match.group(1)
+
+    # 备用提取方法 - 如果JS变量提取失败
+    if not ip_info.get("IP地址"):
+        ip_match = IPV4_PATTERN.search(page_source)
+        if ip_match:
+            ip_info["IP地址"] = ip_match.group(0)
+
+    return ip_info
+
+
+def missing_key_fields(ip_info):
+    """返回缺失的关键字段列表"""
+    return [field for field in KEY_FIELDS if not ip_info.get(field)]
+
+
+def parse_html_file(path, loop_index=1):
+    """读取并解析单个本地页面文件"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        page_source = f.read()
+
+    ip_info = parse_ip_info_from_html(page_source, loop_index, page_url=f"file://{os.path.abspath(path)}")
+    ip_info["页面文件"] = path
+    if missing_key_fields(ip_info):
+        ip_info["调试_页面源码"] = page_source[:500]
+    return ip_info
+
+
+def find_html_files(source):
+    """展开本地页面来源：单个文件、目录（递归查找.html/.htm）或通配符"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(HTML_EXTENSIONS))
+        return sorted(paths)
+
+    if os.path.isfile(source):
+        return [source]
+
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def _parse_indexed(item):
+    index, path = item
+    try:
+        return path, parse_html_file(path, index), None
+    except Exception as e:
+        return path, None, e
+
+
+def parse_saved_pages(paths, workers=None, start_index=1):
+    """并行解析多个本地页面，按输入顺序逐个返回 (文件路径, 检测结果, 异常)
+
+    正则解析是CPU密集型任务，使用多进程绕开GIL；页面较少时直接在当前进程解析
+    """
+    items = list(enumerate(paths, start_index))
+    if workers == 1 or len(items) < 8:
+        for item in items:
+            yield _parse_indexed(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(items) // ((workers or os.cpu_count() or 1) * 8))
+        yield from executor.map(_parse_indexed, items, chunksize=chunksize)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据文件持久化 - 原子写入和后台成组提交
+
+检测循环只把"有新记录"的通知放入有界队列，由写入线程每N条或每T毫秒
+把当前统计整体序列化一次，写入临时文件后原子替换数据文件
+"""
+
+import os
+import queue
+import threading
+import time
+from config import PERSISTENCE_CONFIG
+
+_STOP = object()
+
+
+def atomic_write(path, data, fsync=True):
+    """原子写入：先写临时文件再替换，任何时刻数据文件都是完整的"""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # 同步目录项，确保替换本身也已落盘
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class WriteBehindWriter:
+    """后台写入线程
+
+    serialize 为无参函数，返回要写入的bytes，在写入线程中调用
+    （调用方自行加锁保证序列化时数据一致）
+    """
+
+    def __init__(self, path, serialize, batch_size=None, interval_ms=None, queue_size=None, fsync=None):
+        self.path = path
+        self.serialize = serialize
+        self.batch_size = batch_size or PERSISTENCE_CONFIG["batch_size"]
+        self.interval = (interval_ms or PERSISTENCE_CONFIG["interval_ms"]) / 1000
+        self.fsync = PERSISTENCE_CONFIG["fsync"] if fsync is None else fsync
+        self.queue = queue.Queue(maxsize=queue_size or PERSISTENCE_CONFIG["queue_size"])
+        self.thread = None
+        self.stats = {"提交次数": 0, "合并记录数": 0, "写入失败次数": 0, "最近提交耗时": 0}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """启动写入线程"""
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def submit(self):
+        """通知有一条新记录待提交，从不阻塞"""
+        try:
+            self.queue.put_nowait(1)
+        except queue.Full:
+            # 写入线程落后时，本条记录会包含在下一次整体提交中
+            pass
+
+    def stop(self, timeout=30):
+        """提交队列中剩余的记录并停止写入线程"""
+        if not self.running:
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            # 成组提交：凑满batch_size条或等待满interval后统一写一次
+            pending = 1
+            deadline = time.time() + self.interval
+            while pending < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                pending += 1
+
+            self._commit(pending)
+
+        # 退出前做最后一次提交，包含停止前的全部状态
+        self._commit(0)
+
+    def _commit(self, pending):
+        start = time.time()
+        try:
+            atomic_write(self.path, self.serialize(), self.fsync)
+        except Exception as e:
+            self.stats["写入失败次数"] += 1
+            print(f"❌ 保存数据失败: {e}")
+            return
+        self.stats["提交次数"] += 1
+        self.stats["合并记录数"] += pending
+        self.stats["最近提交耗时"] = round(time.time() - start, 4)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多代理自适应调度 - 用Thompson采样分配检测次数
+
+每次检测按代理质量得到 0~1 的得分（失败为0，成功时由风控值和是否原生IP加权），
+每个代理的得分用 Beta 分布建模。下一次检测分配给采样值最大的代理：
+估计还不确定的代理和看起来更好的代理都更容易被选中。
+质量已经明确的代理（置信区间足够窄，或上界已低于最优代理的下界）不再分配检测，
+全部代理都明确后提前结束，比平均轮询少用很多检测次数。
+置信区间由得分的实际方差计算：得分是连续值，按成功/失败计数处理会高估方差，置信目标几乎无法达到
+"""
+
+import math
+import random
+from config import BANDIT_CONFIG
+from rolling_stats import parse_risk_value
+
+
+def new_arm():
+    """单个代理的累计数据（只保存计数与总和，可精确合并）"""
+    return {
+        "检测次数": 0,
+        "成功次数": 0,
+        "得分总和": 0,
+        "得分平方和": 0,
+        "风控值总和": 0,
+        "风控值计数": 0,
+        "原生IP次数": 0,
+    }
+
+
+def quality_score(ip_info):
+    """一次检测的质量得分：失败为0，成功时风控值越低、原生IP得分越高"""
+    if not ip_info:
+        return 0.0
+    risk = parse_risk_value(ip_info.get("风控值"))
+    risk_score = 1 - min(max(risk, 0), 100) / 100 if risk is not None else 0.5
+    native = 1.0 if "原生" in ip_info.get("原生IP", "") else 0.0
+    return BANDIT_CONFIG["risk_weight"] * risk_score + BANDIT_CONFIG["native_weight"] * native
+
+
+class ProxyBandit:
+    """多代理Thompson采样调度器
+
+    data 为统计字典中的 "代理评估" 项，结构为 {代理: 累计数据}，本类直接在该字典上读写
+    """
+
+    def __init__(self, proxy_urls, data=None):
+        self.data = data if data is not None else {}
+        self.proxy_urls = list(proxy_urls)
+        for proxy_url in self.proxy_urls:
+            self.data.setdefault(proxy_url, new_arm())
+        for arm in self.data.values():
+            # 旧版本数据没有平方和，按得分只取0/1估计（方差偏大，不会过早判定为明确）
+            arm.setdefault("得分平方和", arm["得分总和"])
+
+    def record(self, proxy_url, ip_info):
+        """记录一次检测结果"""
+        arm = self.data.setdefault(proxy_url, new_arm())
+        score = quality_score(ip_info)
+        arm["检测次数"] += 1
+        arm["得分总和"] = round(arm["得分总和"] + score, 4)
+        arm["得分平方和"] = round(arm["得分平方和"] + score * score, 4)
+        if not ip_info:
+            return
+        arm["成功次数"] += 1
+        risk = parse_risk_value(ip_info.get("风控值"))
+        if risk is not None:
+            arm["风控值总和"] += risk
+            arm["风控值计数"] += 1
+        if "原生" in ip_info.get("原生IP", ""):
+            arm["原生IP次数"] += 1
+
+    @staticmethod
+    def posterior(arm):
+        """Beta(1, 1) 先验下的后验参数 (alpha, beta)"""
+        return 1 + arm["得分总和"], 1 + arm["检测次数"] - arm["得分总和"]
+
+    @staticmethod
+    def interval(arm):
+        """平均得分及置信区间 (均值, 下界, 上界)，由得分的样本方差按正态近似计算
+
+        方差加入 prior_weight 个方差为 prior_variance 的伪观测，检测次数少时不会因方差偶然偏小而过早收敛
+        """
+        checks = arm["检测次数"]
+        if not checks:
+            return 0.5, 0.0, 1.0
+        mean = arm["得分总和"] / checks
+        squares = arm.get("得分平方和", arm["得分总和"])
+        variance = max(squares / checks - mean * mean, 0.0)
+        prior_weight = BANDIT_CONFIG["prior_weight"]
+        variance = (variance * checks + BANDIT_CONFIG["prior_variance"] * prior_weight) / (checks + prior_weight)
+        half = BANDIT_CONFIG["z"] * math.sqrt(variance / checks)
+        return mean, max(mean - half, 0.0), min(mean + half, 1.0)
+
+    def settled(self, proxy_url, best_lower=None):
+        """代理的质量是否已经明确，不再需要检测"""
+        arm = self.data[proxy_url]
+        if arm["检测次数"] < BANDIT_CONFIG["min_checks"]:
+            return False
+        if arm["检测次数"] >= BANDIT_CONFIG["max_checks_per_proxy"]:
+            return True
+        _, lower, upper = self.interval(arm)
+        if upper - lower <= BANDIT_CONFIG["ci_width"]:
+            return True
+        # 上界已低于当前最优代理的下界，排名已经确定
+        return best_lower is not None and upper < best_lower
+
+    def _best_lower(self):
+        lowers = [self.interval(self.data[proxy])[1] for proxy in self.proxy_urls
+                  if self.data[proxy]["检测次数"] >= BANDIT_CONFIG["min_checks"]]
+        return max(lowers) if lowers else None
+
+    def candidates(self):
+        """还需要检测的代理"""
+        best_lower = self._best_lower()
+        return [proxy for proxy in self.proxy_urls if not self.settled(proxy, best_lower)]
+
+    def choose(self, exclude=()):
+        """选出下一次检测的代理，所有代理都已明确（或都被排除）时返回None
+
+        exclude 为暂时不可用的代理（如处于熔断冷却期）
+        """
+        best, best_sample = None, -1.0
+        for proxy in self.candidates():
+            if proxy in exclude:
+                continue
+            arm = self.data[proxy]
+            # 未达到最少检测次数的代理优先
+            if arm["检测次数"] < BANDIT_CONFIG["min_checks"]:
+                sample = 1.0 + random.random()
+            else:
+                sample = random.betavariate(*self.posterior(arm))
+            if sample > best_sample:
+                best, best_sample = proxy, sample
+        return best
+
+    def finished(self):
+        return not self.candidates()
+
+    @classmethod
+    def ranking(cls, data):
+        """按质量估计从高到低排列的代理排名"""
+        rows = []
+        for proxy, arm in data.items():
+            if not arm["检测次数"]:
+                continue
+            mean, lower, upper = cls.interval(arm)
+            checks, success = arm["检测次数"], arm["成功次数"]
+            rows.append({
+                "代理": proxy,
+                "质量得分": round(mean, 3),
+                "置信区间": f"{lower:.3f}-{upper:.3f}",
+                "检测次数": checks,
+                "成功率": f"{success / checks * 100:.1f}%",
+                "平均风控值": round(arm["风控值总和"] / arm["风控值计数"], 2) if arm["风控值计数"] else 0,
+                "原生IP占比": f"{arm['原生IP次数'] / success * 100:.1f}%" if success else "0.0%",
+            })
+        rows.sort(key=lambda row: row["质量得分"], reverse=True)
+        for index, row in enumerate(rows, 1):
+            row["排名"] = index
+        return rows
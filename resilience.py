@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测失败处理 - 失败分类、指数退避重试策略和按代理的熔断器
+"""
+
+import random
+import time
+from datetime import datetime
+from config import RETRY_CONFIG, CIRCUIT_BREAKER_CONFIG
+
+# 失败分类
+FAILURE_PROXY_CONNECT = "代理连接失败"
+FAILURE_CHALLENGE = "验证未通过"
+FAILURE_PARSE_MISS = "解析缺失"
+FAILURE_TIMEOUT = "超时"
+FAILURE_CIRCUIT_OPEN = "代理熔断"
+FAILURE_UNKNOWN = "未知错误"
+
+# 浏览器网络错误中表示代理或连接不可用的关键字
+PROXY_ERROR_MARKERS = (
+    "ERR_PROXY_CONNECTION_FAILED",
+    "ERR_TUNNEL_CONNECTION_FAILED",
+    "ERR_CONNECTION_REFUSED",
+    "ERR_CONNECTION_RESET",
+    "ERR_CONNECTION_CLOSED",
+    "ERR_NAME_NOT_RESOLVED",
+    "ERR_SOCKS_CONNECTION_FAILED",
+    "ERR_EMPTY_RESPONSE",
+)
+
+TIMEOUT_ERROR_MARKERS = ("ERR_TIMED_OUT", "ERR_CONNECTION_TIMED_OUT", "timed out", "timeout")
+
+# 检测成功必须具备的字段
+REQUIRED_FIELDS = ("IP地址", "ASN")
+
+
+class CheckDeadlineExceeded(TimeoutError):
+    """单次检测超过总时间预算"""
+
+
+def classify_failure(error=None, ip_info=None, challenge_cleared=True):
+    """对一次检测进行失败分类，检测成功时返回None"""
+    if isinstance(error, TimeoutError):
+        return FAILURE_TIMEOUT
+    if error is not None:
+        message = f"{type(error).__name__}: {error}"
+        if any(marker in message for marker in PROXY_ERROR_MARKERS):
+            return FAILURE_PROXY_CONNECT
+        if "Timeout" in type(error).__name__ or any(marker in message for marker in TIMEOUT_ERROR_MARKERS):
+            return FAILURE_TIMEOUT
+        return FAILURE_UNKNOWN
+
+    if not ip_info:
+        return FAILURE_UNKNOWN
+
+    if all(ip_info.get(field) for field in REQUIRED_FIELDS):
+        return None
+
+    # 字段缺失时，区分是停留在验证页还是页面结构解析失败
+    if not challenge_cleared or "安全验证" in ip_info.get("页面标题", ""):
+        return FAILURE_CHALLENGE
+    return FAILURE_PARSE_MISS
+
+
+class RetryPolicy:
+    """指数退避重试策略"""
+
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None, jitter=None):
+        self.max_retries = RETRY_CONFIG["max_retries"] if max_retries is None else max_retries
+        self.base_delay = RETRY_CONFIG["base_delay"] if base_delay is None else base_delay
+        self.max_delay = RETRY_CONFIG["max_delay"] if max_delay is None else max_delay
+        self.jitter = RETRY_CONFIG["jitter"] if jitter is None else jitter
+
+    def should_retry(self, attempt, failure):
+        """第attempt次（从0开始）尝试失败后是否继续重试"""
+        return attempt < self.max_retries and failure != FAILURE_CIRCUIT_OPEN
+
+    def delay(self, attempt):
+        """第attempt次失败后的等待时间（秒）"""
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class CircuitBreaker:
+    """单个代理的熔断器
+
+    关闭: 正常调度；连续失败达到阈值后 -> 打开
+    打开: 冷却期内不调度任何检测；冷却结束后 -> 半开
+    半开: 只放行一次探测，成功 -> 关闭，失败 -> 打开（冷却时间翻倍）
+    """
+
+    CLOSED = "关闭"
+    OPEN = "打开"
+    HALF_OPEN = "半开"
+
+    def __init__(self, failure_threshold=None, cooldown=None, max_cooldown=None):
+        self.failure_threshold = failure_threshold or CIRCUIT_BREAKER_CONFIG["failure_threshold"]
+        self.base_cooldown = cooldown or CIRCUIT_BREAKER_CONFIG["cooldown"]
+        self.max_cooldown = max_cooldown or CIRCUIT_BREAKER_CONFIG["max_cooldown"]
+        self.cooldown = self.base_cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0
+        self.open_count = 0
+        self.last_failure = None
+
+    def retry_after(self):
+        """距离允许下一次检测还需等待的秒数"""
+        if self.state != self.OPEN:
+            return 0
+        return max(0, self.opened_at + self.cooldown - time.time())
+
+    def allow(self):
+        """当前是否允许对该代理发起检测"""
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self, failure=None):
+        self.consecutive_failures += 1
+        self.last_failure = failure
+
+        if self.state == self.HALF_OPEN:
+            # 探测失败，重新熔断并延长冷却时间
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        self.open_count += 1
+
+    def to_dict(self):
+        """熔断器状态（用于统计输出）"""
+        return {
+            "状态": self.state,
+            "连续失败次数": self.consecutive_failures,
+            "熔断次数": self.open_count,
+            "最近失败类型": self.last_failure,
+            "冷却时间": self.cooldown,
+            "剩余冷却": round(self.retry_after(), 1),
+            "熔断时间": datetime.fromtimestamp(self.opened_at).strftime("%Y-%m-%d %H:%M:%S") if self.opened_at else None,
+        }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器进程资源统计与残留进程清理
+
+本工具启动的Chrome都使用带前缀和属主PID的临时配置目录
+(--user-data-dir=.../p0cc-chrome-<pid>-xxxx)，据此识别自己的进程：
+属主进程已退出的Chrome及其chromedriver即为残留进程
+"""
+
+import os
+import re
+import shutil
+import tempfile
+from config import BROWSER_RESOURCE_CONFIG
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PROFILE_PATTERN = re.compile(re.escape(BROWSER_RESOURCE_CONFIG["profile_prefix"]) + r"(\d+)-")
+# 按单个命令行参数匹配，配置目录路径中可以有空格（如Windows用户临时目录）
+USER_DATA_DIR_PATTERN = re.compile(r"--user-data-dir=.*?" + PROFILE_PATTERN.pattern)
+
+
+def create_profile_dir():
+    """创建带属主PID标记的浏览器临时配置目录"""
+    return tempfile.mkdtemp(prefix=f"{BROWSER_RESOURCE_CONFIG['profile_prefix']}{os.getpid()}-")
+
+
+def remove_profile_dir(path):
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def process_tree(pid):
+    """返回以pid为根的进程树（psutil.Process列表），进程不存在时返回空列表"""
+    if psutil is None or not pid:
+        return []
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def sample_process_tree(pid):
+    """统计进程树的内存、CPU时间和子进程数，psutil不可用时返回None"""
+    processes = process_tree(pid)
+    if not processes:
+        return None
+
+    rss, cpu = 0, 0.0
+    alive = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+            times = process.cpu_times()
+            cpu += times.user + times.system
+            alive += 1
+        except psutil.Error:
+            continue
+
+    return {
+        "内存MB": round(rss / 1024 / 1024, 1),
+        "CPU秒": round(cpu, 2),
+        "子进程数": max(alive - 1, 0),
+    }
+
+
+def exceeds_limits(usage):
+    """资源占用是否超过配置的上限"""
+    if not usage:
+        return False
+    return (usage["内存MB"] > BROWSER_RESOURCE_CONFIG["max_rss_mb"]
+            or usage["子进程数"] > BROWSER_RESOURCE_CONFIG["max_children"])
+
+
+def kill_processes(processes):
+    """结束一组进程，返回实际结束的数量"""
+    killed = 0
+    for process in processes:
+        try:
+            process.kill()
+            killed += 1
+        except psutil.Error:
+            continue
+    if processes:
+        psutil.wait_procs(processes, timeout=3)
+    return killed
+
+
+def kill_process_tree(pid):
+    """结束以pid为根的进程树"""
+    return kill_processes(process_tree(pid))
+
+
+def _is_orphan(owner_pid, include_own):
+    """属主进程已退出（或要求清理本进程自己的）时视为残留"""
+    if owner_pid == os.getpid():
+        return include_own
+    if psutil is not None:
+        return not psutil.pid_exists(owner_pid)
+    if os.name == "nt":
+        # Windows上 os.kill 会直接结束目标进程，没有psutil时无法安全判断属主是否存活，不清理
+        return False
+    try:
+        os.kill(owner_pid, 0)
+        return False
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+
+
+def reap_orphan_browsers(include_own=False):
+    """清理属主已退出的残留Chrome/chromedriver进程，include_own=True时也清理本进程启动的
+
+    返回清理的进程数，psutil不可用时只清理临时配置目录，返回0
+    """
+    targets = {}
+    for process in psutil.process_iter(["pid", "cmdline"]) if psutil else []:
+        if process.pid == os.getpid():
+            continue
+        try:
+            args = process.info["cmdline"] or []
+        except psutil.Error:
+            continue
+        match = next((m for m in map(USER_DATA_DIR_PATTERN.search, args) if m), None)
+        if not match:
+            continue
+
+        if not _is_orphan(int(match.group(1)), include_own):
+            continue
+
+        targets[process.pid] = process
+        try:
+            # 父进程是chromedriver时一并结束
+            parent = process.parent()
+            if parent and "chromedriver" in (parent.name() or "").lower():
+                targets[parent.pid] = parent
+        except psutil.Error:
+            pass
+
+    killed = kill_processes(list(targets.values())) if targets else 0
+
+    # 清理残留的临时配置目录
+    tmp_dir = tempfile.gettempdir()
+    for name in os.listdir(tmp_dir):
+        match = PROFILE_PATTERN.match(name)
+        if match and _is_orphan(int(match.group(1)), include_own):
+            remove_profile_dir(os.path.join(tmp_dir, name))
+
+    return killed
+
+
+def new_resource_stats():
+    """浏览器资源统计（只保存总和与峰值，多份统计可以精确合并）"""
+    return {
+        "采样次数": 0,
+        "内存MB总和": 0,
+        "CPU秒总和": 0,
+        "峰值内存MB": 0,
+        "峰值子进程数": 0,
+        "回收次数": 0,
+        "清理残留进程数": 0,
+    }
+
+
+def record_usage(stats, usage):
+    """把一次检测的资源占用累加到统计中"""
+    if not usage:
+        return
+    stats["采样次数"] += 1
+    stats["内存MB总和"] = round(stats["内存MB总和"] + usage["内存MB"], 1)
+    stats["CPU秒总和"] = round(stats["CPU秒总和"] + usage["CPU秒"], 2)
+    stats["峰值内存MB"] = max(stats["峰值内存MB"], usage["内存MB"])
+    stats["峰值子进程数"] = max(stats["峰值子进程数"], usage["子进程数"])
+
+
+def merge_resource_stats(target, source):
+    """合并两份浏览器资源统计（就地修改target）"""
+    for key in ("采样次数", "内存MB总和", "CPU秒总和", "回收次数", "清理残留进程数"):
+        target[key] = round(target.get(key, 0) + source.get(key, 0), 2)
+    for key in ("峰值内存MB", "峰值子进程数"):
+        target[key] = max(target.get(key, 0), source.get(key, 0))
+    return target
+
+
+def describe_resource_stats(stats):
+    """计算平均内存和平均CPU时间"""
+    samples = stats.get("采样次数", 0)
+    return {
+        "采样次数": samples,
+        "平均内存MB": round(stats.get("内存MB总和", 0) / samples, 1) if samples else 0,
+        "平均CPU秒": round(stats.get("CPU秒总和", 0) / samples, 2) if samples else 0,
+        "峰值内存MB": stats.get("峰值内存MB", 0),
+        "峰值子进程数": stats.get("峰值子进程数", 0),
+        "回收次数": stats.get("回收次数", 0),
+        "清理残留进程数": stats.get("清理残留进程数", 0),
+    }
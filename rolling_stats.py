@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滚动窗口统计 - 按分钟/小时分桶的计数器
+每次检测只更新当前分钟桶和当前小时桶（O(1)），查询窗口时只合并窗口内的桶，
+不需要重新扫描检测结果；桶数据直接保存在统计字典中，随数据文件一起持久化
+"""
+
+import time
+from config import ROLLING_STATS_CONFIG
+
+MINUTE = 60
+HOUR = 3600
+
+
+def new_bucket():
+    """创建空的统计桶"""
+    return {
+        "检测次数": 0,
+        "成功次数": 0,
+        "风控值总和": 0,
+        "风控值计数": 0,
+        "原生IP次数": 0,
+        "新IP次数": 0,
+        "IP类型": {},
+        "风控等级": {},
+        "国家": {},
+    }
+
+
+def parse_risk_value(risk_value):
+    """将 "97%" 形式的风控值转换为数字，无法解析时返回None"""
+    try:
+        return float(str(risk_value).replace("%", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def merge_bucket(target, source):
+    """把source桶累加到target桶"""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            counter = target.setdefault(key, {})
+            for name, count in value.items():
+                counter[name] = counter.get(name, 0) + count
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+class RollingWindowStats:
+    """滚动窗口统计
+
+    data 为统计字典中的 "时间窗口统计" 项，结构为 {"分钟": {桶起始时间戳: 桶}, "小时": {...}}，
+    本类直接在该字典上读写
+    """
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else {}
+        self.minute_limit = ROLLING_STATS_CONFIG["minute_buckets"]
+        self.hour_limit = ROLLING_STATS_CONFIG["hour_buckets"]
+
+        # 按时间排序，保证最旧的桶总在最前面，淘汰时从头部删除即可
+        for level in ("分钟", "小时"):
+            buckets = self.data.get(level, {})
+            self.data[level] = {key: buckets[key] for key in sorted(buckets, key=int)}
+
+    def record(self, ip_info, timestamp=None, new_ip=False):
+        """记录一次检测（ip_info为None表示检测失败，new_ip表示该IP是否首次出现）"""
+        timestamp = time.time() if timestamp is None else timestamp
+
+        for level, size, limit in (("分钟", MINUTE, self.minute_limit), ("小时", HOUR, self.hour_limit)):
+            bucket = self._bucket(level, int(timestamp // size * size), size, limit)
+            if bucket is not None:
+                self._add(bucket, ip_info, new_ip)
+
+    def summary(self, seconds, now=None):
+        """统计最近seconds秒内的数据（精度为桶大小）"""
+        now = time.time() if now is None else now
+
+        # 窗口能被分钟桶完整覆盖时用分钟桶，否则用小时桶
+        if seconds <= self.minute_limit * MINUTE:
+            level, size = "分钟", MINUTE
+        else:
+            level, size = "小时", HOUR
+
+        start = int((now - seconds) // size * size)
+        total = new_bucket()
+        for key, bucket in self.data[level].items():
+            if int(key) >= start:
+                merge_bucket(total, bucket)
+
+        return self.describe(total)
+
+    def summaries(self, now=None):
+        """按配置的时间窗口输出统计"""
+        return {name: self.summary(seconds, now) for name, seconds in ROLLING_STATS_CONFIG["windows"].items()}
+
+    @staticmethod
+    def describe(bucket):
+        """把桶中的原始计数转换为可读的统计结果"""
+        checks, success = bucket["检测次数"], bucket["成功次数"]
+        return {
+            "检测次数": checks,
+            "成功次数": success,
+            "成功率": f"{success / checks * 100:.1f}%" if checks else "0.0%",
+            "平均风控值": round(bucket["风控值总和"] / bucket["风控值计数"], 2) if bucket["风控值计数"] else 0,
+            "原生IP占比": f"{bucket['原生IP次数'] / success * 100:.1f}%" if success else "0.0%",
+            "新IP占比": f"{bucket.get('新IP次数', 0) / success * 100:.1f}%" if success else "0.0%",
+            "IP类型分布": bucket["IP类型"],
+            "风控等级分布": bucket["风控等级"],
+            "国家分布": bucket["国家"],
+        }
+
+    def _bucket(self, level, start, size, limit):
+        """获取时间对应的桶，已超出保留范围时返回None"""
+        buckets = self.data[level]
+        key = str(start)
+        bucket = buckets.get(key)
+        if bucket is None:
+            newest = int(next(reversed(buckets))) if buckets else start
+            cutoff = max(start, newest) - (limit - 1) * size
+            if start < cutoff:
+                return None
+
+            bucket = buckets[key] = new_bucket()
+            if start < newest:
+                # 乱序写入（很少发生）时重新排序，保持最旧的桶在最前面
+                self.data[level] = buckets = {k: buckets[k] for k in sorted(buckets, key=int)}
+
+            # 只在新建桶时淘汰过期桶，均摊O(1)
+            while buckets:
+                oldest = next(iter(buckets))
+                if int(oldest) >= cutoff:
+                    break
+                del buckets[oldest]
+        return bucket
+
+    @staticmethod
+    def _add(bucket, ip_info, new_ip):
+        bucket["检测次数"] += 1
+        if not ip_info:
+            return
+
+        bucket["成功次数"] += 1
+        if new_ip:
+            bucket["新IP次数"] = bucket.get("新IP次数", 0) + 1
+
+        risk_num = parse_risk_value(ip_info.get("风控值"))
+        if risk_num is not None:
+            bucket["风控值总和"] += risk_num
+            bucket["风控值计数"] += 1
+
+        native_ip = ip_info.get("原生IP", "")
+        if "原生" in native_ip:
+            bucket["原生IP次数"] += 1
+
+        location = ip_info.get("IP位置", "未知")
+        country = location.split()[0] if location and location != "未知" else "未知"
+
+        for key, value in (("IP类型", ip_info.get("IP类型", "未知")),
+                           ("风控等级", ip_info.get("风控等级", "未知")),
+                           ("国家", country)):
+            bucket[key][value] = bucket[key].get(value, 0) + 1
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代理轮换周期估计 - 从出口IP的变化时间学习粘性会话时长，把下一次检测安排在预计轮换之后
+
+每次成功检测记录 (观测时间, IP是否变化)。相邻两次观测之间IP变化说明其间至少发生了一次轮换，
+IP不变说明其间没有轮换。轮换时间为 相位 + k × 周期，在候选周期和相位上搜索与最近观测最一致的一组：
+先用相邻IP变化时间间隔的中位数得到粗略周期，再在其附近细化。
+检测被安排在轮换之后时，单个变化区间很宽，只取区间中点会系统性地估早轮换时间，联合拟合则不受影响。
+几乎每次检测IP都变化时视为按连接轮换，不需要额外等待。
+
+观测时间取检测完成时刻，与真正建立连接的时刻相差大约一次检测的耗时，
+安排检测时用检测耗时作为提前量抵消
+"""
+
+import math
+from config import ROTATION_CONFIG
+
+MODE_UNKNOWN = "未知"
+MODE_PER_CONNECTION = "每次连接"
+MODE_TIMED = "定时轮换"
+
+# 周期和相位搜索的网格点数（周期先粗搜再在最优值附近细搜）
+PERIOD_STEPS = 30
+PHASE_STEPS = 40
+
+
+def new_rotation_state():
+    return {
+        "检测次数": 0,
+        "IP变化次数": 0,
+        "上次IP": None,
+        "上次观测时间": None,
+        "观测": [],          # 最近的 [观测时间, IP是否变化]
+        "轮换周期": None,     # 拟合结果（秒）
+        "轮换时间": None,     # 拟合得到的最近一次已发生轮换的时间
+        "拟合一致率": None,
+    }
+
+
+def _rotations_between(start, end, anchor, period):
+    """在 (start, end] 内、时间为 anchor + k × period 的轮换次数"""
+    return math.floor((end - anchor) / period) - math.floor((start - anchor) / period)
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+class RotationEstimator:
+    """单个代理的轮换周期估计
+
+    data 为统计字典 "轮换估计" 中该代理的项，本类直接在该字典上读写
+    """
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else new_rotation_state()
+        for key, value in new_rotation_state().items():
+            self.data.setdefault(key, value)
+
+    def observe(self, ip, timestamp):
+        """记录一次成功检测观测到的出口IP并重新拟合周期，返回IP是否与上一次不同"""
+        data = self.data
+        data["检测次数"] += 1
+        changed = data["上次IP"] is not None and ip != data["上次IP"]
+        if changed:
+            data["IP变化次数"] += 1
+        data["上次IP"] = ip
+        data["上次观测时间"] = timestamp
+        observations = data["观测"]
+        observations.append([round(timestamp, 2), int(changed)])
+        del observations[:-ROTATION_CONFIG["max_samples"]]
+        self.fit()
+        return changed
+
+    def change_ratio(self):
+        """相邻两次检测IP发生变化的比例"""
+        pairs = self.data["检测次数"] - 1
+        return self.data["IP变化次数"] / pairs if pairs > 0 else 0.0
+
+    def mode(self):
+        if self.data["检测次数"] <= ROTATION_CONFIG["min_samples"]:
+            return MODE_UNKNOWN
+        if self.change_ratio() >= ROTATION_CONFIG["per_connection_ratio"]:
+            return MODE_PER_CONNECTION
+        if self.data["轮换周期"]:
+            return MODE_TIMED
+        return MODE_UNKNOWN
+
+    def fit(self):
+        """用最近的观测拟合轮换周期和轮换时间，样本不足时保持为None"""
+        data = self.data
+        data["轮换周期"] = data["轮换时间"] = data["拟合一致率"] = None
+        observations = data["观测"]
+        # 第一条观测的变化标记相对于更早（已丢弃）的观测，不参与拟合
+        pairs = [(a[0], b[0], b[1]) for a, b in zip(observations, observations[1:])]
+        change_times = [b for a, b, changed in pairs if changed]
+        if len(change_times) <= ROTATION_CONFIG["min_samples"]:
+            return
+
+        # 粗略周期：相邻变化区间中点的间隔中位数
+        midpoints = [(a + b) / 2 for a, b, changed in pairs if changed]
+        rough = _median([b - a for a, b in zip(midpoints, midpoints[1:])])
+        if rough <= 0:
+            return
+
+        coarse = [rough * (0.5 + step / PERIOD_STEPS) for step in range(PERIOD_STEPS + 1)]
+        _, period, _ = self._search(pairs, coarse)
+        step = rough / PERIOD_STEPS
+        fine = [period + step * (index / PERIOD_STEPS * 2 - 1) for index in range(PERIOD_STEPS + 1)]
+        best_score, period, anchor = self._search(pairs, fine)
+
+        data["轮换周期"] = round(period, 2)
+        data["轮换时间"] = round(anchor, 2)
+        data["拟合一致率"] = round(best_score / len(pairs), 3)
+
+    @staticmethod
+    def _search(pairs, periods):
+        """在候选周期上搜索与观测最一致的 (一致数, 周期, 轮换时间)"""
+        # 最近一次观测到变化的区间，其中必有一次轮换，相位以它为基准搜索
+        last_start, last_change = next((a, b) for a, b, changed in reversed(pairs) if changed)
+        best_score, best = -1, []
+        for period in periods:
+            # 轮换时间 = last_change - offset，offset 从小到大，一致性相同时取最晚的轮换时间
+            span = min(last_change - last_start, period)
+            for phase_step in range(PHASE_STEPS):
+                anchor = last_change - span * phase_step / PHASE_STEPS
+                score = sum(1 for a, b, changed in pairs
+                            if (_rotations_between(a, b, anchor, period) > 0) == bool(changed))
+                if score > best_score:
+                    best_score, best = score, [(period, anchor)]
+                elif score == best_score and best[-1][0] != period:
+                    best.append((period, anchor))
+        # 一致性相同的周期取中间值
+        period, anchor = best[len(best) // 2]
+        return best_score, period, anchor
+
+    def period(self):
+        """轮换周期（秒），样本不足或按连接轮换时返回None"""
+        return self.data["轮换周期"] if self.mode() == MODE_TIMED else None
+
+    def next_check_delay(self, now, lead=0):
+        """距下一次检测开始应等待的秒数，无法估计时返回None（使用固定间隔）
+
+        lead 为检测开始到观测到IP的典型耗时
+        """
+        mode = self.mode()
+        if mode == MODE_PER_CONNECTION:
+            return ROTATION_CONFIG["min_delay"]
+        period = self.period()
+        if period is None:
+            return None
+
+        # 上一次观测之后的第一次预计轮换
+        anchor, last_seen = self.data["轮换时间"], self.data["上次观测时间"]
+        expected = anchor + (math.floor((last_seen - anchor) / period) + 1) * period
+        margin = ROTATION_CONFIG["margin_seconds"] + ROTATION_CONFIG["margin_fraction"] * period
+        delay = expected - lead + margin - now
+        return min(max(delay, ROTATION_CONFIG["min_delay"]), ROTATION_CONFIG["max_wait"])
+
+    def describe(self):
+        period = self.period()
+        return {
+            "轮换方式": self.mode(),
+            "轮换周期(秒)": round(period, 1) if period else None,
+            "拟合一致率": self.data["拟合一致率"],
+            "检测次数": self.data["检测次数"],
+            "IP变化次数": self.data["IP变化次数"],
+            "IP变化率": f"{self.change_ratio() * 100:.1f}%",
+        }
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+概率统计结构 - 用固定内存估算独立元素数量和"是否见过"
+HyperLogLog 估算独立IP/ASN/网段数，布隆过滤器判断IP是否重复出现，
+两者都可以按寄存器/位图合并，用于跨多次运行、多台主机汇总；
+蓄水池抽样保留固定数量的检测耗时样本，用于估算耗时分位数
+"""
+
+import base64
+import hashlib
+import ipaddress
+import math
+import random
+import zlib
+from config import SKETCH_CONFIG, DEADLINE_CONFIG
+
+
+def _hash64(value):
+    """64位哈希"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# 寄存器值对应的 2^-r，用于增量维护估算公式中的调和和
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+
+def _encode(data):
+    # 使用最快的压缩级别，每次保存数据文件时都会序列化
+    return base64.b64encode(zlib.compress(bytes(data), 1)).decode("ascii")
+
+
+def _decode(text):
+    return bytearray(zlib.decompress(base64.b64decode(text)))
+
+
+class HyperLogLog:
+    """HyperLogLog 基数估算"""
+
+    def __init__(self, precision=None, registers=None):
+        self.precision = precision or SKETCH_CONFIG["hll_precision"]
+        self.size = 1 << self.precision
+        self.registers = registers if registers is not None else bytearray(self.size)
+
+        # 偏差修正系数
+        if self.size >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.size)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.size, 0.673)
+
+        self._reset_totals()
+
+    def _reset_totals(self):
+        # 增量维护调和和与零寄存器数，count() 不需要遍历寄存器
+        self._inverse_sum = sum(_INVERSE_POWERS[r] for r in self.registers)
+        self._zeros = self.registers.count(0)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        # 剩余位中第一个1出现的位置
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        current = self.registers[index]
+        if rank > current:
+            self._inverse_sum += _INVERSE_POWERS[rank] - _INVERSE_POWERS[current]
+            if current == 0:
+                self._zeros -= 1
+            self.registers[index] = rank
+
+    def count(self):
+        """估算的独立元素数量"""
+        estimate = self.alpha * self.size * self.size / self._inverse_sum
+        zeros = self._zeros
+        # 小基数时使用线性计数修正
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """合并另一个同精度的HyperLogLog（取寄存器最大值）"""
+        if other.precision != self.precision:
+            raise ValueError(f"HyperLogLog精度不一致: {self.precision} != {other.precision}")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        self._reset_totals()
+        return self
+
+    def to_dict(self):
+        return {"精度": self.precision, "寄存器": _encode(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["精度"], _decode(data["寄存器"]))
+
+
+class BloomFilter:
+    """布隆过滤器"""
+
+    def __init__(self, capacity=None, error_rate=None, bits=None, num_bits=None, num_hashes=None):
+        self.capacity = capacity or SKETCH_CONFIG["bloom_capacity"]
+        self.error_rate = error_rate or SKETCH_CONFIG["bloom_error_rate"]
+        self.num_bits = num_bits or int(math.ceil(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, value):
+        # 双重哈希：由两个64位哈希生成k个位置
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, value):
+        """加入元素，返回加入前是否（可能）已经存在"""
+        present = True
+        for position in self._positions(value):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & mask:
+                present = False
+                self.bits[byte] |= mask
+        return present
+
+    def __contains__(self, value):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+    def merge(self, other):
+        """合并另一个参数相同的布隆过滤器（按位或）"""
+        if (other.num_bits, other.num_hashes) != (self.num_bits, self.num_hashes):
+            raise ValueError("布隆过滤器参数不一致，无法合并")
+        # 整个位图按大整数一次性按位或，比逐字节合并快得多
+        merged = int.from_bytes(self.bits, "big") | int.from_bytes(other.bits, "big")
+        self.bits = bytearray(merged.to_bytes(len(self.bits), "big"))
+        return self
+
+    def to_dict(self):
+        return {
+            "容量": self.capacity,
+            "误判率": self.error_rate,
+            "位数": self.num_bits,
+            "哈希数": self.num_hashes,
+            "位图": _encode(self.bits),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["容量"], data["误判率"], _decode(data["位图"]), data["位数"], data["哈希数"])
+
+
+def ip_prefix(ip):
+    """IP所在网段（IPv4默认/24，IPv6默认/48），无效IP返回None"""
+    try:
+        address = ipaddress.ip_address(str(ip).strip())
+    except ValueError:
+        return None
+    prefix = SKETCH_CONFIG["ipv4_prefix"] if address.version == 4 else SKETCH_CONFIG["ipv6_prefix"]
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class PoolSketches:
+    """IP池概率统计 - 独立IP/ASN/网段估算和重复观测统计"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.ips = HyperLogLog.from_dict(data["独立IP"]) if "独立IP" in data else HyperLogLog()
+        self.asns = HyperLogLog.from_dict(data["独立ASN"]) if "独立ASN" in data else HyperLogLog()
+        self.prefixes = HyperLogLog.from_dict(data["独立网段"]) if "独立网段" in data else HyperLogLog()
+        self.seen = BloomFilter.from_dict(data["已见IP"]) if "已见IP" in data else BloomFilter()
+        self.observations = data.get("观测次数", 0)
+        self.repeats = data.get("重复观测次数", 0)
+
+    def observe(self, ip_info):
+        """记录一次成功检测，返回该IP是否为首次出现"""
+        ip = ip_info.get("IP地址")
+        if not ip:
+            return False
+
+        self.observations += 1
+        self.ips.add(ip)
+        if ip_info.get("ASN"):
+            self.asns.add(ip_info["ASN"])
+        prefix = ip_prefix(ip)
+        if prefix:
+            self.prefixes.add(prefix)
+
+        if self.seen.add(ip):
+            self.repeats += 1
+            return False
+        return True
+
+    def merge(self, other):
+        """合并另一份统计（用于多次运行或多台主机汇总）"""
+        self.ips.merge(other.ips)
+        self.asns.merge(other.asns)
+        self.prefixes.merge(other.prefixes)
+        self.seen.merge(other.seen)
+        self.observations += other.observations
+        self.repeats += other.repeats
+        return self
+
+    def estimates(self):
+        """估算结果"""
+        return {
+            "独立IP数": self.ips.count(),
+            "独立ASN数": self.asns.count(),
+            "独立网段数": self.prefixes.count(),
+            "观测次数": self.observations,
+            "重复观测次数": self.repeats,
+            "重复率": f"{self.repeats / self.observations * 100:.1f}%" if self.observations else "0.0%",
+        }
+
+    def to_dict(self):
+        return {
+            "独立IP": self.ips.to_dict(),
+            "独立ASN": self.asns.to_dict(),
+            "独立网段": self.prefixes.to_dict(),
+            "已见IP": self.seen.to_dict(),
+            "观测次数": self.observations,
+            "重复观测次数": self.repeats,
+        }
+
+
+class ReservoirSample:
+    """蓄水池抽样 - 固定容量的均匀样本，用于估算检测耗时的P50/P95/P99
+
+    data 为统计字典中的 "检测耗时分布" 项，本类直接在该字典上读写
+    """
+
+    def __init__(self, data=None, capacity=None):
+        self.data = data if data is not None else {}
+        self.data.setdefault("样本", [])
+        self.data.setdefault("总数", 0)
+        self.data.setdefault("最大值", 0)
+        self.capacity = capacity or DEADLINE_CONFIG["sample_size"]
+
+    def add(self, value):
+        samples = self.data["样本"]
+        self.data["总数"] += 1
+        self.data["最大值"] = max(self.data["最大值"], value)
+        if len(samples) < self.capacity:
+            samples.append(value)
+        else:
+            index = random.randrange(self.data["总数"])
+            if index < self.capacity:
+                samples[index] = value
+
+    def merge(self, other):
+        """合并另一份样本：按两边的总数加权抽取，合并后仍是整体的均匀样本"""
+        mine, theirs = list(self.data["样本"]), list(other.data["样本"])
+        random.shuffle(mine)
+        random.shuffle(theirs)
+        my_total, their_total = self.data["总数"], other.data["总数"]
+
+        merged = []
+        while len(merged) < self.capacity and (mine or theirs):
+            if not theirs or (mine and random.random() * (my_total + their_total) < my_total):
+                merged.append(mine.pop())
+            else:
+                merged.append(theirs.pop())
+
+        self.data["样本"] = merged
+        self.data["总数"] = my_total + their_total
+        self.data["最大值"] = max(self.data["最大值"], other.data["最大值"])
+        return self
+
+    def percentile(self, pct):
+        ordered = sorted(self.data["样本"])
+        if not ordered:
+            return None
+        position = (len(ordered) - 1) * pct / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    def summary(self):
+        """耗时分位数（秒）"""
+        result = {"检测次数": self.data["总数"], "样本数": len(self.data["样本"])}
+        for pct in (50, 95, 99):
+            value = self.percentile(pct)
+            result[f"P{pct}"] = round(value, 2) if value is not None else 0
+        result["最大值"] = round(self.data["最大值"], 2)
+        return result